@@ -0,0 +1,150 @@
+import logging
+import game_stats
+import xp
+from db import db_transaction, db_write
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
+
+# Jedes Achievement hat ein festes Bit in user_game_stats.achievements (nie umnummerieren).
+# Freigeschaltet, sobald metric >= target; "blackjack" ist 1, wenn die Runde selbst
+# ein Blackjack (21 aus zwei Karten) war.
+ACHIEVEMENTS = [
+    {
+        "id": "first_win",
+        "bit": 0,
+        "title_key": "stats.achievement.firstWin.title",
+        "title": "First Win",
+        "desc_key": "stats.achievement.firstWin.desc",
+        "desc": "Win your first hand.",
+        "xp": 100,
+        "metric": "wins",
+        "target": 1,
+    },
+    {
+        "id": "first_blackjack",
+        "bit": 1,
+        "title_key": "stats.achievement.firstBlackjack.title",
+        "title": "First Blackjack",
+        "desc_key": "stats.achievement.firstBlackjack.desc",
+        "desc": "Hit 21 with your first two cards.",
+        "xp": 150,
+        "metric": "blackjack",
+        "target": 1,
+    },
+    {
+        "id": "win_streak_3",
+        "bit": 2,
+        "title_key": "stats.achievement.winStreak3.title",
+        "title": "3 Win Streak",
+        "desc_key": "stats.achievement.winStreak3.desc",
+        "desc": "Win three hands in a row.",
+        "xp": 150,
+        "metric": "max_streak",
+        "target": 3,
+    },
+    {
+        "id": "win_streak_5",
+        "bit": 3,
+        "title_key": "stats.achievement.winStreak5.title",
+        "title": "5 Win Streak",
+        "desc_key": "stats.achievement.winStreak5.desc",
+        "desc": "Win five hands in a row.",
+        "xp": 250,
+        "metric": "max_streak",
+        "target": 5,
+    },
+    {
+        "id": "games_10",
+        "bit": 4,
+        "title_key": "stats.achievement.games10.title",
+        "title": "10 Games Played",
+        "desc_key": "stats.achievement.games10.desc",
+        "desc": "Play ten hands.",
+        "xp": 100,
+        "metric": "total_games",
+        "target": 10,
+    },
+]
+
+
+def _award_key(achievement):
+    return f"achievement.{achievement['id']}"
+
+
+def _unlock(user_id, mask, new):
+    # Bits setzen (OR, damit parallele Abrechnungen sich nicht überschreiben) und XP vergeben
+    bits = sum(1 << a["bit"] for a in new)
+    db_write(
+        "UPDATE user_game_stats SET achievements = achievements | %s WHERE user_id=%s",
+        (bits, user_id),
+    )
+    xp.award(user_id, [(_award_key(a), a["xp"]) for a in new])
+    return mask | bits
+
+
+def evaluate(user_id, win=False, blackjack=False):
+    """Nach einer abgerechneten Runde (im selben db_transaction(), nach game_stats.record_*).
+
+    Prüft nur Achievements, deren Metrik sich durch diese Runde ändern kann,
+    und nur solche, deren Bit noch nicht gesetzt ist. Gibt die IDs der neu
+    freigeschalteten Achievements zurück.
+    """
+    affected = {"total_games"}
+    if win:
+        affected |= {"wins", "max_streak"}
+    if blackjack:
+        affected.add("blackjack")
+
+    stats = game_stats.get_stats(user_id)
+    mask = stats["achievements"]
+    values = dict(stats, blackjack=int(bool(blackjack)))
+    new = [
+        a for a in ACHIEVEMENTS
+        if a["metric"] in affected
+        and not mask & (1 << a["bit"])
+        and values[a["metric"]] >= a["target"]
+    ]
+    if new:
+        _unlock(user_id, mask, new)
+        logger.debug("User %s: Achievements %s freigeschaltet", user_id, [a["id"] for a in new])
+    return [a["id"] for a in new]
+
+
+def for_display(mask):
+    """Alle Achievements fürs Template, mit "unlocked" aus der Bitmaske (ohne Query)."""
+    return [dict(a, unlocked=bool(mask & (1 << a["bit"]))) for a in ACHIEVEMENTS]
+
+
+def backfill():
+    """Einmalig: Bitmasken aller User aus Zählern, Historie und bereits vergebenen XP aufbauen.
+
+    Vorher game_stats.backfill() und backfill_blackjack_outcomes() laufen lassen.
+    Fehlende XP werden nachvergeben.
+    """
+    with db_transaction() as tx:
+        masks = {}
+        by_key = {_award_key(a): a for a in ACHIEVEMENTS}
+        for r in tx.read(
+            "SELECT user_id, award_key FROM xp_rewards WHERE award_key LIKE %s", ("achievement.%",)
+        ):
+            if r["award_key"] in by_key:
+                masks[r["user_id"]] = masks.get(r["user_id"], 0) | (1 << by_key[r["award_key"]]["bit"])
+
+        users = tx.read("SELECT user_id FROM user_game_stats")
+        for r in users:
+            user_id = r["user_id"]
+            stats = game_stats.get_stats(user_id)
+            values = dict(stats, blackjack=int(game_stats.has_natural(user_id)))
+            mask = masks.get(user_id, 0)
+            new = [
+                a for a in ACHIEVEMENTS
+                if not mask & (1 << a["bit"]) and values[a["metric"]] >= a["target"]
+            ]
+            tx.write(
+                "UPDATE user_game_stats SET achievements = %s WHERE user_id=%s", (mask, user_id)
+            )
+            if new:
+                _unlock(user_id, mask, new)
+    logger.info("Achievements für %s User neu aufgebaut", len(users))
+    return len(users)
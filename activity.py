@@ -0,0 +1,30 @@
+import logging
+from db import current_transaction, db_read, db_write
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
+
+
+def bump(user_id):
+    """Aktivitätsversion erhöhen: bei allem, was /stats verändert (Abrechnung, XP, Konto).
+
+    Innerhalb von db_transaction() erst nach dem Commit und nur einmal pro
+    Transaktion; so wird nie eine neue Version mit noch alten Daten gecacht.
+    """
+    tx = current_transaction()
+    if tx is not None:
+        tx.after_commit(_bump, user_id)
+    else:
+        _bump(user_id)
+
+
+def _bump(user_id):
+    db_write("UPDATE users SET activity_version = activity_version + 1 WHERE id=%s", (user_id,))
+
+
+def get_version(user_id):
+    """Aktuelle Version vom Primary (current_user.activity_version ist der Stand bei Request-Beginn)."""
+    row = db_read(
+        "SELECT activity_version FROM users WHERE id=%s", (user_id,), single=True, primary=True
+    )
+    return int((row or {}).get("activity_version") or 0)
@@ -10,13 +10,15 @@ login_manager = LoginManager()
 
 
 class User(UserMixin):
-    def __init__(self, id, username, password, email=None, tutorial_seen_blackjack=False, tutorial_seen_roulette=False):
+    def __init__(self, id, username, password, email=None, tutorial_seen_blackjack=False, tutorial_seen_roulette=False, activity_version=0):
         self.id = id
         self.username = username
         self.password = password
         self.email = email
         self.tutorial_seen_blackjack = tutorial_seen_blackjack
         self.tutorial_seen_roulette = tutorial_seen_roulette
+        # Zähler für Cache-Keys (siehe activity.py), kommt ohne Extra-Query mit dem User
+        self.activity_version = activity_version
 
     @staticmethod
     def get_by_id(user_id):
@@ -39,7 +41,8 @@ class User(UserMixin):
                 row["password"],
                 row.get("email"),
                 row.get("tutorial_seen_blackjack"),
-                row.get("tutorial_seen_roulette")
+                row.get("tutorial_seen_roulette"),
+                row.get("activity_version") or 0
             )
         else:
             logger.warning("User.get_by_id(): kein User mit id=%s gefunden", user_id)
@@ -66,7 +69,8 @@ class User(UserMixin):
                 row["password"],
                 row.get("email"),
                 row.get("tutorial_seen_blackjack"),
-                row.get("tutorial_seen_roulette")
+                row.get("tutorial_seen_roulette"),
+                row.get("activity_version") or 0
             )
         else:
             logger.info("User.get_by_username(): kein User mit username=%s", username)
@@ -93,7 +97,8 @@ class User(UserMixin):
                 row["password"],
                 row.get("email"),
                 row.get("tutorial_seen_blackjack"),
-                row.get("tutorial_seen_roulette")
+                row.get("tutorial_seen_roulette"),
+                row.get("activity_version") or 0
             )
         else:
             logger.info("User.get_by_email(): kein User mit email=%s", email)
@@ -1,53 +1,157 @@
+import os
 import random
 
 SUITS = ['♠', '♥', '♦', '♣']
 RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
 
-def create_deck():
-    return [f"{rank}{suit}" for suit in SUITS for rank in RANKS]
-
-def card_value(card):
-    rank = card[:-1]
-    if rank in ['J', 'Q', 'K']:
-        return 10
-    elif rank == 'A':
-        return 11
-    else:
-        return int(rank)
-
-def hand_value(hand):
-    total = sum(card_value(c) for c in hand)
-    aces = sum(1 for c in hand if c[:-1] == 'A')
-    while total > 21 and aces:
-        total -= 10
-        aces -= 1
-    return total
+# Regeln (auch für simulator.py): Dealer zieht bis 17 und steht auf allen 17 (auch soft),
+# Auszahlung als Vielfaches des Einsatzes (inkl. Einsatz), Blackjack ohne Bonus 1:1
+DEALER_STANDS_ON = 17
+PAYOUTS = {'player_win': 2, 'push': 1, 'dealer_win': 0, 'player_bust': 0}
+
+# Einstellungen (.env): Decks im Schuh und Anteil, nach dem die Cut Card kommt
+SHOE_DECKS = int(os.getenv("BLACKJACK_DECKS", "6"))
+SHOE_PENETRATION = float(os.getenv("BLACKJACK_PENETRATION", "0.75"))
+
+# Karten intern als int 0-51 (suit * 13 + rank, Index in CARD_NAMES);
+# Strings wie "10♠" nur an der Grenze zu JSON/DB (encode bzw. CARD_NAMES)
+CARD_NAMES = tuple(f"{rank}{suit}" for suit in SUITS for rank in RANKS)
+CARD_INDEX = {name: card for card, name in enumerate(CARD_NAMES)}
+RANK_VALUES = tuple(11 if rank == 'A' else 10 if rank in ('J', 'Q', 'K') else int(rank) for rank in RANKS)
+CARD_VALUES = tuple(RANK_VALUES[card % 13] for card in range(52))
+CARD_IS_ACE = tuple(RANKS[card % 13] == 'A' for card in range(52))
+
+
+def encode(card):
+    return CARD_INDEX[card]
+
+
+class Hand:
+    """Karten (ints) mit laufend nachgeführtem Wert: add() ist O(1)."""
+
+    __slots__ = ('cards', 'value', 'soft_aces')
+
+    def __init__(self, cards=()):
+        self.cards = []
+        self.value = 0
+        self.soft_aces = 0  # Asse, die noch als 11 zählen
+        for card in cards:
+            self.add(card)
+
+    def add(self, card):
+        self.cards.append(card)
+        self.value += CARD_VALUES[card]
+        if CARD_IS_ACE[card]:
+            self.soft_aces += 1
+        while self.value > 21 and self.soft_aces:
+            self.value -= 10
+            self.soft_aces -= 1
+
+    @property
+    def is_blackjack(self):
+        return len(self.cards) == 2 and self.value == 21
+
+    def names(self):
+        return [CARD_NAMES[c] for c in self.cards]
+
+
+class Shoe:
+    """N Decks, einmal gemischt: ein Byte pro Karte plus Position, draw() ist O(1).
+
+    Neu gemischt wird erst, wenn die Cut Card erreicht ist (vor der nächsten Hand).
+    """
+
+    __slots__ = ('decks', 'cards', 'position', 'cut')
+
+    def __init__(self, decks=SHOE_DECKS, cards=None, position=0, cut=None):
+        self.decks = decks
+        self.cards = bytearray(cards) if cards is not None else bytearray()
+        self.position = position
+        self.cut = cut if cut is not None else 0
+        if cards is None:
+            self.shuffle()
+
+    def shuffle(self, exclude=()):
+        """Alle Karten neu mischen; exclude (Karten auf dem Tisch) je einmal weglassen,
+        soweit der Schuh sie hat (Hände aus einem grösseren Schuh können doppelte Karten haben)."""
+        cards = list(range(52)) * self.decks
+        for card in exclude:
+            if card in cards:
+                cards.remove(card)
+        random.shuffle(cards)
+        self.cards = bytearray(cards)
+        self.position = 0
+        self.cut = int(len(cards) * SHOE_PENETRATION)
+
+    @property
+    def needs_shuffle(self):
+        return self.position >= self.cut
+
+    def draw(self):
+        card = self.cards[self.position]
+        self.position += 1
+        return card
+
 
 class BlackjackGame:
-    def __init__(self):
-        self.deck = create_deck()
-        random.shuffle(self.deck)
-        self.player_hand = [self.deck.pop(), self.deck.pop()]
-        self.dealer_hand = [self.deck.pop(), self.deck.pop()]
+    def __init__(self, shoe=None):
+        # Ohne Schuh wie früher: ein frisch gemischtes Deck pro Hand
+        self.shoe = shoe if shoe is not None else Shoe(decks=1)
+        if self.shoe.needs_shuffle:
+            self.shoe.shuffle()
+        self.player = Hand()
+        self.dealer = Hand()
+        self.player.add(self._draw())
+        self.player.add(self._draw())
+        self.dealer.add(self._draw())
+        self.dealer.add(self._draw())
         self.finished = False
         self.result = None
 
+    @classmethod
+    def restore(cls, player_hand, dealer_hand, finished=False, result=None, shoe=None):
+        """Laufendes Spiel aus den gespeicherten Händen (Strings) wiederherstellen.
+
+        Ohne Schuh bleibt game.shoe None: wer danach zieht, setzt ihn vorher selbst
+        (live_sessions.lock_shoe)."""
+        game = cls.__new__(cls)
+        game.player = Hand(encode(c) for c in player_hand)
+        game.dealer = Hand(encode(c) for c in dealer_hand)
+        game.shoe = shoe
+        game.finished = bool(finished)
+        game.result = result
+        return game
+
+    def _draw(self):
+        # Schuh leer mitten in der Hand (nur bei sehr tiefer Cut Card möglich)
+        if self.shoe.position >= len(self.shoe.cards):
+            self.shoe.shuffle(exclude=self.player.cards + self.dealer.cards)
+        return self.shoe.draw()
+
+    @property
+    def player_hand(self):
+        return self.player.names()
+
+    @property
+    def dealer_hand(self):
+        return self.dealer.names()
+
     def hit(self):
         if self.finished:
             return
-        self.player_hand.append(self.deck.pop())
-        if hand_value(self.player_hand) > 21:
+        self.player.add(self._draw())
+        if self.player.value > 21:
             self.finished = True
             self.result = 'player_bust'
 
     def stand(self):
         if self.finished:
             return
-        while hand_value(self.dealer_hand) < 17:
-            self.dealer_hand.append(self.deck.pop())
+        while self.dealer.value < DEALER_STANDS_ON:
+            self.dealer.add(self._draw())
         self.finished = True
-        p_val = hand_value(self.player_hand)
-        d_val = hand_value(self.dealer_hand)
+        p_val = self.player.value
+        d_val = self.dealer.value
         if d_val > 21 or p_val > d_val:
             self.result = 'player_win'
         elif p_val < d_val:
@@ -58,9 +162,9 @@ class BlackjackGame:
     def state(self):
         return {
             'player_hand': self.player_hand,
-            'dealer_hand': self.dealer_hand if self.finished else [self.dealer_hand[0], '??'],
-            'player_value': hand_value(self.player_hand),
-            'dealer_value': hand_value(self.dealer_hand) if self.finished else '?',
+            'dealer_hand': self.dealer_hand if self.finished else [CARD_NAMES[self.dealer.cards[0]], '??'],
+            'player_value': self.player.value,
+            'dealer_value': self.dealer.value if self.finished else '?',
             'finished': self.finished,
             'result': self.result
         }
@@ -0,0 +1,259 @@
+import logging
+import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from blackjack_engine import DEALER_STANDS_ON, PAYOUTS, RANK_VALUES, SHOE_DECKS
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
+
+# Einstellungen (.env)
+BLACKJACK_ODDS_PATH = os.getenv(
+    "BLACKJACK_ODDS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "blackjack_odds.pickle")
+)
+BLACKJACK_ODDS_CACHE_SIZE = int(os.getenv("BLACKJACK_ODDS_CACHE_SIZE", "4096"))
+
+# Zusammensetzung = Anzahl Karten pro Wert 2..11 (Index Wert - 2, 10 = alle Zehner, 11 = Ass).
+# Dealer-Endstände: 17..21 und Bust
+_FINALS = 6
+_BUST = 5
+_WIN = PAYOUTS["player_win"] - 1
+_PUSH = PAYOUTS["push"] - 1
+_LOSS = PAYOUTS["dealer_win"] - 1
+# Aufbau der Datei; ältere Dateien (nur Starthände) werden ignoriert
+_FORMAT = 2
+
+
+def fresh_counts(decks=SHOE_DECKS):
+    counts = [0] * 10
+    for value in RANK_VALUES:
+        counts[value - 2] += 4 * decks
+    return tuple(counts)
+
+
+def _remove(counts, value):
+    i = value - 2
+    return counts[:i] + (counts[i] - 1,) + counts[i + 1:]
+
+
+def _add(total, soft_aces, value):
+    # wie Hand.add: Ass zählt 11, solange die Hand nicht überkauft
+    total += value
+    soft_aces += value == 11
+    while total > 21 and soft_aces:
+        total -= 10
+        soft_aces -= 1
+    return total, soft_aces
+
+
+@lru_cache(maxsize=20_000)
+def _dealer(counts, total, soft_aces):
+    # Verteilung der Dealer-Endstände ab (total, soft_aces) mit exakter Kartenentnahme
+    if total >= DEALER_STANDS_ON:
+        finals = [0.0] * _FINALS
+        finals[total - 17 if total <= 21 else _BUST] = 1.0
+        return tuple(finals)
+    remaining = sum(counts)
+    finals = [0.0] * _FINALS
+    for i, count in enumerate(counts):
+        if not count:
+            continue
+        p = count / remaining
+        for k, q in enumerate(_dealer(_remove(counts, i + 2), *_add(total, soft_aces, i + 2))):
+            finals[k] += p * q
+    return tuple(finals)
+
+
+def dealer_distribution(counts, upcard):
+    """Wahrscheinlichkeiten der Dealer-Endstände (17, 18, 19, 20, 21, Bust) für die offene
+    Karte upcard (Wert 2-11); counts: unbekannte Karten inkl. verdeckter Dealer-Karte."""
+    return _dealer(counts, *_add(0, 0, upcard))
+
+
+def _stand_ev(total, finals):
+    ev = finals[_BUST] * _WIN
+    for k in range(_BUST):
+        dealer_total = 17 + k
+        ev += finals[k] * (_WIN if total > dealer_total else _LOSS if total < dealer_total else _PUSH)
+    return ev
+
+
+def _evaluator(counts, upcard):
+    # EV-Tabelle plus Funktion, die Einträge (total, soft_aces) rekursiv ausrechnet
+    finals = dealer_distribution(counts, upcard)
+    remaining = sum(counts)
+    draws = [(i + 2, count / remaining) for i, count in enumerate(counts) if count]
+    table = {}
+
+    def best(total, soft_aces):
+        key = (total, soft_aces > 0)
+        if key not in table:
+            stand = _stand_ev(total, finals)
+            hit = 0.0
+            for value, p in draws:
+                t, s = _add(total, soft_aces, value)
+                hit += p * (_LOSS if t > 21 else max(best(t, s)))
+            table[key] = (stand, hit)
+        return table[key]
+
+    return table, best
+
+
+def player_table(counts, upcard):
+    """EV von Stand und Hit für alle Spieler-Stände (total, soft) gegen upcard.
+
+    Dealer-Verteilung exakt für counts; für weitere Karten des Spielers gilt die
+    Zusammensetzung am Entscheidungspunkt. {(total, soft): (stand_ev, hit_ev)}
+    """
+    table, best = _evaluator(counts, upcard)
+    for total in range(4, 22):
+        best(total, 0)
+    for total in range(12, 22):
+        best(total, 1)
+    return table
+
+
+def hand_ev(counts, upcard, values):
+    """(stand_ev, hit_ev) der Hand mit den Kartenwerten values (2-11) gegen upcard;
+    counts: unbekannte Karten. Rechnet nur die Stände, die von der Hand aus erreichbar sind."""
+    total, soft_aces = 0, 0
+    for value in values:
+        total, soft_aces = _add(total, soft_aces, value)
+    return _evaluator(counts, upcard)[1](total, soft_aces)
+
+
+def hands():
+    """Alle offenen Hände als sortierte Kartenwerte: zwei Karten oder mehr, nicht überkauft."""
+    result = []
+
+    def extend(hand, hard_total):
+        if len(hand) >= 2:
+            result.append(hand)
+        for value in range(hand[-1] if hand else 2, 12):
+            # nur aufsteigend, so kommt jede Zusammensetzung einmal vor; Ass zählt hart 1
+            if hard_total + (1 if value == 11 else value) <= 21:
+                extend(hand + (value,), hard_total + (1 if value == 11 else value))
+
+    extend((), 0)
+    return result
+
+
+# {(Kartenwerte der Hand sortiert, upcard): (stand_ev, hit_ev)} für jede offene Hand,
+# aus der Datei von build-blackjack-odds geladen (warm_up); ein Hint ist dann ein Dict-Lookup
+_hints = {}
+
+
+@lru_cache(maxsize=BLACKJACK_ODDS_CACHE_SIZE)
+def _hand_ev(values, upcard):
+    # Solange die Tabellen noch laden oder die Datei fehlt bzw. veraltet ist
+    counts = _remove(_FRESH, upcard)
+    for value in values:
+        counts = _remove(counts, value)
+    return hand_ev(counts, upcard, values)
+
+
+def _build_upcard(upcard, decks):
+    fresh = _remove(fresh_counts(decks), upcard)
+    entries = {}
+    for values in hands():
+        counts = fresh
+        for value in values:
+            counts = _remove(counts, value)
+        if min(counts) >= 0:
+            entries[(values, upcard)] = hand_ev(counts, upcard, values)
+    # Der Dealer-Cache hängt an der genauen Zusammensetzung, für die nächste Karte nutzlos
+    _dealer.cache_clear()
+    return entries
+
+
+def build(decks=SHOE_DECKS, workers=1):
+    """EV für alle offenen Hände gegen jede offene Karte: {(values, upcard): (stand, hit)}."""
+    upcards = range(2, 12)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_build_upcard, upcards, [decks] * len(upcards)))
+    else:
+        parts = [_build_upcard(upcard, decks) for upcard in upcards]
+    tables = {}
+    for part in parts:
+        tables.update(part)
+    return tables
+
+
+def _rules():
+    # Alles, wovon die Tabellen abhängen; passt die Datei nicht, wird sie ignoriert
+    return (_FORMAT, SHOE_DECKS, DEALER_STANDS_ON, _WIN, _PUSH, _LOSS)
+
+
+def save(path=None, workers=1):
+    """Tabellen für BLACKJACK_DECKS berechnen und nach path schreiben."""
+    path = path or BLACKJACK_ODDS_PATH
+    tables = build(workers=workers)
+    # Erst in eine temporäre Datei: laufende Worker lesen nie eine halbe Datei
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"rules": _rules(), "tables": tables}, f)
+    os.replace(tmp, path)
+    return len(tables)
+
+
+_init_lock = threading.Lock()
+
+
+def init(path=None):
+    """Tabellen aus der Datei laden (einmal pro Prozess). Gerechnet werden sie nur
+    mit build-blackjack-odds; fehlt die Datei, rechnet hint() jede Hand einzeln."""
+    global _hints
+    with _init_lock:
+        if not _hints:
+            _hints = _load(path or BLACKJACK_ODDS_PATH)
+    return len(_hints)
+
+
+def _load(path):
+    try:
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+    except FileNotFoundError:
+        logger.warning("%s fehlt, Hints werden pro Hand gerechnet (flask --app flask_app build-blackjack-odds)", path)
+        return {}
+    if data.get("rules") != _rules():
+        logger.warning("%s passt nicht zu den aktuellen Regeln, bitte build-blackjack-odds neu ausführen", path)
+        return {}
+    logger.info("%s Blackjack-Hints aus %s geladen", len(data["tables"]), path)
+    return data["tables"]
+
+
+_warm_up_started = False
+
+
+def warm_up():
+    """init() einmal pro Prozess im Hintergrund-Thread starten, damit kein Request
+    auf das Laden wartet; bis dahin rechnet hint() die Hand einzeln."""
+    global _warm_up_started
+    if _warm_up_started:
+        return
+    _warm_up_started = True
+    threading.Thread(target=init, name="blackjack-odds", daemon=True).start()
+
+
+_FRESH = fresh_counts()
+
+
+def hint(game):
+    """EV von Hit und Stand (Nettogewinn pro Einsatz) für die offene Hand.
+
+    Gerechnet wird nur mit den sichtbaren Karten dieser Hand (Spielerhand und offene
+    Dealer-Karte) gegen einen vollen Schuh; der Zustand des Schuhs bleibt geheim.
+    """
+    if game.finished:
+        return None
+    upcard = RANK_VALUES[game.dealer.cards[0] % 13]
+    values = tuple(sorted(RANK_VALUES[card % 13] for card in game.player.cards))
+    entry = _hints.get((values, upcard))
+    if entry is None:
+        entry = _hand_ev(values, upcard)
+    stand, hit = entry
+    return {"stand": stand, "hit": hit, "best": "hit" if hit > stand else "stand"}
@@ -0,0 +1,320 @@
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
+
+# Einstellungen (.env)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # memory, redis oder none
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1000"))
+CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))  # Sekunden
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_SQLITE_PATH = os.getenv(
+    "CACHE_SQLITE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache.db")
+)
+
+
+class MemoryStore:
+    """LRU-Cache im Prozess: höchstens max_entries Einträge, jeder höchstens ttl Sekunden.
+
+    Jeder Worker hat seinen eigenen Cache; das ist unkritisch, solange die
+    Keys eine Version enthalten (siehe activity.py). on_evict(key, value) wird
+    für jeden verdrängten oder abgelaufenen Eintrag aufgerufen (ausserhalb des Locks).
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries=1000, ttl=300, on_evict=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _evicted(self, entries):
+        for key, value in entries:
+            if self.on_evict is not None:
+                try:
+                    self.on_evict(key, value)
+                except Exception:
+                    logger.exception("on_evict für %s fehlgeschlagen", key)
+
+    def get(self, key):
+        evicted = []
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                    evicted.append((key, entry[1]))
+                self.misses += 1
+                value = None
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                value = entry[1]
+        self._evicted(evicted)
+        return value
+
+    def set(self, key, value):
+        evicted = []
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._pop_oldest())
+            # Abgelaufene am LRU-Ende gleich mitnehmen (nur bis zum ersten gültigen)
+            while self._entries and next(iter(self._entries.values()))[0] < now:
+                evicted.append(self._pop_oldest())
+        self._evicted(evicted)
+
+    def _pop_oldest(self):
+        key, (_, value) = self._entries.popitem(last=False)
+        self.evictions += 1
+        return key, value
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def drain(self):
+        """Alle Einträge entfernen und on_evict für jeden aufrufen (z.B. beim Beenden)."""
+        with self._lock:
+            entries = [(key, value) for key, (_, value) in self._entries.items()]
+            self._entries.clear()
+        self._evicted(entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.name,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class RedisStore:
+    """Geteilter Cache für mehrere Worker/Server (redis-py, Werte gepickelt).
+
+    Verdrängung übernimmt Redis selbst: maxmemory + maxmemory-policy allkeys-lru.
+    """
+
+    name = "redis"
+
+    def __init__(self, url, ttl=300, prefix="casino:"):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        try:
+            raw = self._redis.get(self.prefix + key)
+        except Exception:
+            logger.exception("Redis-Cache nicht erreichbar")
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pickle.loads(raw)
+
+    def set(self, key, value):
+        try:
+            self._redis.setex(self.prefix + key, self.ttl, pickle.dumps(value))
+        except Exception:
+            logger.exception("Redis-Cache nicht erreichbar")
+
+    def delete(self, key):
+        try:
+            self._redis.delete(self.prefix + key)
+        except Exception:
+            logger.exception("Redis-Cache nicht erreichbar")
+
+    def drain(self):
+        pass  # Einträge gehören Redis, siehe create_store
+
+    def stats(self):
+        return {"backend": self.name, "hits": self.hits, "misses": self.misses}
+
+
+class SQLiteStore:
+    """Geteilter Cache für mehrere Worker auf einem Server: eine SQLite-Datei als Key-Value-Store.
+
+    LRU über touched_at, TTL über expires_at (Wanduhr, gilt für alle Prozesse).
+    Verdrängt wird gesammelt (alle EVICT_EVERY Schreibzugriffe bzw. EVICT_INTERVAL
+    Sekunden), max_entries darf also kurz überschritten werden; on_evict ruft genau
+    der Worker auf, dessen DELETE die Zeile entfernt hat.
+    """
+
+    name = "sqlite"
+    EVICT_EVERY = 100
+    EVICT_INTERVAL = 5.0  # Sekunden
+    TOUCH_INTERVAL = 30.0  # get() schreibt touched_at höchstens so oft pro Eintrag
+
+    def __init__(self, path, max_entries=1000, ttl=300, on_evict=None, table="cache"):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._sets = 0
+        self._last_evict = time.time()
+        conn = self._open()
+        try:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL, touched_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_touched ON {table} (touched_at)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_expires ON {table} (expires_at)")
+        finally:
+            conn.close()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        # WAL: Leser blockieren Schreiber nicht; NORMAL: kein fsync pro Commit (Cache, kein Ledger)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _conn(self):
+        # Eine Verbindung pro Thread und Prozess (nach fork nicht weiterverwenden)
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            local.conn = self._open()
+            local.pid = os.getpid()
+        return local.conn
+
+    def _evict(self, conn, rows):
+        for key, raw, expires_at in rows:
+            claimed = conn.execute(
+                f"DELETE FROM {self.table} WHERE key=? AND expires_at=?", (key, expires_at)
+            ).rowcount
+            if not claimed:
+                continue  # anderer Worker war schneller
+            self.evictions += 1
+            if self.on_evict is not None:
+                try:
+                    self.on_evict(key, pickle.loads(raw))
+                except Exception:
+                    logger.exception("on_evict für %s fehlgeschlagen", key)
+
+    def get(self, key):
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            f"SELECT value, expires_at, touched_at FROM {self.table} WHERE key=?", (key,)
+        ).fetchone()
+        if row is None or row[1] < now:
+            if row is not None:
+                self._evict(conn, [(key, row[0], row[1])])
+            self.misses += 1
+            return None
+        if now - row[2] > self.TOUCH_INTERVAL:
+            conn.execute(f"UPDATE {self.table} SET touched_at=? WHERE key=?", (now, key))
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, touched_at) VALUES (?, ?, ?, ?)",
+            (key, pickle.dumps(value), now + self.ttl, now),
+        )
+        self._sets += 1
+        if self._sets >= self.EVICT_EVERY or now - self._last_evict >= self.EVICT_INTERVAL:
+            self._sets = 0
+            self._last_evict = now
+            self.evict(now)
+
+    def evict(self, now=None):
+        """Abgelaufene Einträge und alles über max_entries (am längsten unbenutzt) entfernen."""
+        now = now or time.time()
+        conn = self._conn()
+        expired = conn.execute(
+            f"SELECT key, value, expires_at FROM {self.table} WHERE expires_at < ?", (now,)
+        ).fetchall()
+        overflow = conn.execute(
+            f"SELECT key, value, expires_at FROM {self.table} WHERE expires_at >= ? "
+            "ORDER BY touched_at DESC LIMIT -1 OFFSET ?",
+            (now, self.max_entries),
+        ).fetchall()
+        self._evict(conn, expired + overflow)
+
+    def delete(self, key):
+        self._conn().execute(f"DELETE FROM {self.table} WHERE key=?", (key,))
+
+    def drain(self):
+        conn = self._conn()
+        self._evict(conn, conn.execute(f"SELECT key, value, expires_at FROM {self.table}").fetchall())
+
+    def stats(self):
+        size = self._conn().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        return {
+            "backend": self.name,
+            "size": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class NullStore:
+    """Cache aus (CACHE_BACKEND=none)."""
+
+    name = "none"
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def drain(self):
+        pass
+
+    def stats(self):
+        return {"backend": self.name}
+
+
+def create_store(name=None, max_entries=None, ttl=None, on_evict=None, namespace="cache"):
+    """namespace trennt mehrere Stores im selben Backend (Tabelle bzw. Key-Prefix)."""
+    name = name or CACHE_BACKEND
+    ttl = CACHE_TTL if ttl is None else ttl
+    max_entries = max_entries or CACHE_MAX_ENTRIES
+    if name == "memory":
+        return MemoryStore(max_entries, ttl, on_evict=on_evict)
+    if name == "sqlite":
+        return SQLiteStore(CACHE_SQLITE_PATH, max_entries, ttl, on_evict=on_evict, table=namespace)
+    if name == "redis":
+        if on_evict is not None:
+            # Redis verdrängt selbst und meldet es nicht zurück
+            raise ValueError("CACHE_BACKEND redis unterstützt kein on_evict")
+        return RedisStore(CACHE_REDIS_URL, ttl, prefix=f"casino:{namespace}:")
+    if name == "none":
+        return NullStore()
+    raise ValueError(f"Unbekanntes CACHE_BACKEND: {name}")
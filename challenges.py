@@ -0,0 +1,232 @@
+import logging
+import xp
+from datetime import datetime
+from db import db_read, db_write_many
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
+
+# Zähler pro User und Zeitraum (Tag bzw. Event), siehe challenge_progress.
+# Dazu kommen current_streak/max_streak für Siegesserien innerhalb des Zeitraums.
+METRICS = ["games", "wins", "blackjacks", "black_wins", "color_wins"]
+
+# Tages-Challenges: Zähler pro UTC-Tag, XP einmal pro Tag
+DAILY_CHALLENGES = [
+    {
+        "id": "play5",
+        "title_key": "stats.challenge.play5",
+        "title": "Play 5 rounds",
+        "metric": "games",
+        "target": 5,
+        "xp": 50,
+    },
+    {
+        "id": "win2",
+        "title_key": "stats.challenge.win2",
+        "title": "Win 2 rounds",
+        "metric": "wins",
+        "target": 2,
+        "xp": 75,
+    },
+    {
+        "id": "play10",
+        "title_key": "stats.challenge.play10",
+        "title": "Play 10 rounds",
+        "metric": "games",
+        "target": 10,
+        "xp": 100,
+    },
+]
+
+# Zeitlich begrenzte Events: jährliches Fenster (Monat, Tag) bis (Monat, Tag) 23:59 UTC.
+# metric None = wird (noch) nicht erfasst, zeigt immer 0.
+EVENTS = [
+    {
+        "id": "halloween",
+        "title_key": "stats.event.halloween.title",
+        "title": "Halloween Event – Night of Luck",
+        "theme": "halloween",
+        "start": (10, 28),
+        "end": (10, 31),
+        "challenges": [
+            {
+                "desc_key": "stats.event.halloween.challenge1",
+                "desc": "Win 3 rounds in a row. Bonus: +50% XP during the event.",
+                "metric": "max_streak",
+                "target": 3,
+            },
+            {
+                "desc_key": "stats.event.halloween.challenge2",
+                "desc": "Hit Blackjack once. Bonus: +50% XP during the event.",
+                "metric": "blackjacks",
+                "target": 1,
+            },
+            {
+                "desc_key": "stats.event.halloween.challenge3",
+                "desc": "Win on black 2 times (Roulette). Bonus: +50% XP during the event.",
+                "metric": "black_wins",
+                "target": 2,
+            },
+        ],
+    },
+    {
+        "id": "winter",
+        "title_key": "stats.event.winter.title",
+        "title": "Winter / Christmas Event – Holiday Jackpot",
+        "theme": "winter",
+        "start": (12, 20),
+        "end": (12, 26),
+        "challenges": [
+            {
+                "desc_key": "stats.event.winter.challenge1",
+                "desc": "Play 10 rounds total. Bonus: Daily login reward.",
+                "metric": "games",
+                "target": 10,
+            },
+            {
+                "desc_key": "stats.event.winter.challenge2",
+                "desc": "Win 5 times. Bonus: Daily login reward.",
+                "metric": "wins",
+                "target": 5,
+            },
+            {
+                "desc_key": "stats.event.winter.challenge3",
+                "desc": "Reach a win streak of 3. Bonus: Daily login reward.",
+                "metric": "max_streak",
+                "target": 3,
+            },
+        ],
+    },
+    {
+        "id": "newyear",
+        "title_key": "stats.event.newyear.title",
+        "title": "New Year Event – Double or Nothing",
+        "theme": "newyear",
+        "start": (12, 31),
+        "end": (1, 2),
+        "challenges": [
+            {
+                "desc_key": "stats.event.newyear.challenge1",
+                "desc": "Win on red OR black 3 times (Roulette). Bonus: Double XP on all games.",
+                "metric": "color_wins",
+                "target": 3,
+            },
+            {
+                "desc_key": "stats.event.newyear.challenge2",
+                "desc": "Win a hand with Double Down (Blackjack). Bonus: Double XP on all games.",
+                "metric": None,
+                "target": 1,
+            },
+            {
+                "desc_key": "stats.event.newyear.challenge3",
+                "desc": "Reach a new personal best balance. Bonus: Double XP on all games.",
+                "metric": None,
+                "target": 1,
+            },
+        ],
+    },
+]
+
+
+def _window(event, year):
+    (start_month, start_day), (end_month, end_day) = event["start"], event["end"]
+    end_year = year + 1 if end_month < start_month else year
+    return datetime(year, start_month, start_day), datetime(end_year, end_month, end_day, 23, 59)
+
+
+def event_window(event, now):
+    """(start, end) des laufenden oder nächsten Event-Fensters.
+
+    Fenster über den Jahreswechsel (z.B. 31.12.-2.1.) können im Vorjahr begonnen
+    haben, darum wird ab dem Fenster des Vorjahrs gesucht.
+    """
+    for year in (now.year - 1, now.year, now.year + 1):
+        start, end = _window(event, year)
+        if now <= end:
+            return start, end
+
+
+def _periods(now):
+    # (scope, period) aller Zähler, die zu now gehören: der Tag plus jedes Event-Fenster
+    # (period = Starttag des Fensters, so bekommt jedes Jahr eigene Zähler)
+    periods = [("daily", now.strftime("%Y-%m-%d"), None, None)]
+    for event in EVENTS:
+        start, end = event_window(event, now)
+        periods.append((event["id"], start.strftime("%Y-%m-%d"), start, end))
+    return periods
+
+
+def record(user_id, win, blackjack=False, black_win=False, color_win=False, now=None):
+    """Abgerechnete Runde in allen gerade aktiven Zählern verbuchen (ein Upsert)
+    und erreichte Tages-Challenges mit XP belohnen.
+
+    Im selben db_transaction() wie die Abrechnung aufrufen. blackjack: Hand mit
+    21 aus zwei Karten; black_win/color_win: Spin mit gewonnener Farbwette
+    (auf Schwarz bzw. auf eine beliebige Farbe).
+    """
+    now = now or datetime.utcnow()
+    win = int(bool(win))
+    deltas = (1, win, int(bool(blackjack)), int(bool(black_win)), int(bool(color_win)))
+    rows = [
+        (user_id, scope, period, *deltas, win, win)
+        for scope, period, start, end in _periods(now)
+        if start is None or start <= now <= end
+    ]
+    # Serie wie in game_stats._add: max_streak vor current_streak
+    db_write_many(
+        "INSERT INTO challenge_progress (user_id, scope, period, " + ", ".join(METRICS) + ", max_streak, current_streak) "
+        "VALUES (%s, %s, %s, " + ", ".join(["%s"] * len(METRICS)) + ", %s, %s)",
+        rows,
+        on_duplicate=", ".join(f"{m} = {m} + VALUES({m})" for m in METRICS) + ", "
+        "max_streak = GREATEST(max_streak, (current_streak + 1) * VALUES(current_streak)), "
+        "current_streak = (current_streak + 1) * VALUES(current_streak)",
+    )
+
+    # Zähler steigen um 1 pro Runde: belohnt wird genau beim Erreichen des Ziels,
+    # und nur für Metriken, die diese Runde verändert hat (INSERT IGNORE schützt zusätzlich)
+    changed = {m for m, d in zip(METRICS, deltas) if d}
+    daily = [c for c in DAILY_CHALLENGES if c["metric"] in changed]
+    if daily:
+        today = now.strftime("%Y-%m-%d")
+        row = db_read(
+            "SELECT " + ", ".join(METRICS) + " FROM challenge_progress "
+            "WHERE user_id=%s AND scope='daily' AND period=%s",
+            (user_id, today),
+            single=True,
+        ) or {}
+        xp.award(user_id, [
+            (f"daily.{c['id']}.{today}", c["xp"])
+            for c in daily
+            if int(row.get(c["metric"]) or 0) == c["target"]
+        ])
+
+
+def progress(user_id, now=None):
+    """Tages- und Event-Challenges mit Fortschritt für /stats, aus einer Query.
+
+    Gibt (daily, events) zurück: daily wie DAILY_CHALLENGES plus "value",
+    events wie EVENTS plus "start"/"end" (datetime) und "value" je Challenge.
+    """
+    now = now or datetime.utcnow()
+    periods = _periods(now)
+    rows = db_read(
+        "SELECT * FROM challenge_progress WHERE user_id=%s AND ("
+        + " OR ".join(["(scope=%s AND period=%s)"] * len(periods)) + ")",
+        (user_id, *(v for scope, period, _, _ in periods for v in (scope, period))),
+    )
+    by_scope = {(r["scope"], r["period"]): r for r in rows}
+
+    def _with_values(challenges, scope, period):
+        row = by_scope.get((scope, period)) or {}
+        return [
+            dict(c, value=int(row.get(c["metric"]) or 0) if c["metric"] else 0)
+            for c in challenges
+        ]
+
+    _, today, _, _ = periods[0]
+    daily = _with_values(DAILY_CHALLENGES, "daily", today)
+    events = [
+        dict(event, start=start, end=end, challenges=_with_values(event["challenges"], scope, period))
+        for event, (scope, period, start, end) in zip(EVENTS, periods[1:])
+    ]
+    return daily, events
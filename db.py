@@ -1,6 +1,19 @@
 from dotenv import load_dotenv
+import itertools
+import logging
 import os
-from mysql.connector import pooling
+import re
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from flask import g, has_request_context
+from db_backends import create_backend
+from db_pool import ConnectionPool
+import db_profiler
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
 
 # Load .env variables
 load_dotenv()
@@ -8,28 +21,204 @@ DB_CONFIG = {
     "host": os.getenv("DB_HOST"),
     "user": os.getenv("DB_USER"),
     "password": os.getenv("DB_PASSWORD"),
-    "database": os.getenv("DB_DATABASE")
+    "database": os.getenv("DB_DATABASE"),
+    "port": int(os.getenv("DB_PORT", "3306")),
 }
 
-# Init db
-pool = pooling.MySQLConnectionPool(pool_name="pool", pool_size=5, **DB_CONFIG)
+# Max. Zeilen pro Multi-Row-INSERT in db_write_many
+WRITE_MANY_CHUNK_SIZE = int(os.getenv("DB_WRITE_MANY_CHUNK_SIZE", "500"))
+
+# Pool-Einstellungen (siehe db_pool.ConnectionPool)
+POOL_CONFIG = {
+    "size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_POOL_MAX_OVERFLOW", "0")),
+    "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+    "max_waiters": int(os.getenv("DB_POOL_MAX_WAITERS", "0")),
+    "pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1",
+}
+
+# Backend: "mysql" (Produktion) oder "sqlite" (lokal, ohne Server; DB_SQLITE_PATH)
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql")
+backend = create_backend(DB_BACKEND, DB_CONFIG)
+if backend.max_connections:
+    POOL_CONFIG["size"] = min(POOL_CONFIG["size"], backend.max_connections)
+    POOL_CONFIG["max_overflow"] = 0
+
+# Init db (Connections werden erst beim ersten get_conn() geöffnet)
+pool = ConnectionPool(
+    backend.connect,
+    ping=backend.ping,
+    name="primary",
+    **POOL_CONFIG
+)
 def get_conn():
     return pool.get_connection()
 
-# DB-Helper
-def db_read(sql, params=None, single=False):
+
+def pool_stats():
+    return pool.stats()
+
+
+# Read-Replicas (optional): DB_REPLICA_HOSTS=host1[:port],host2[:port]
+REPLICA_HOSTS = [h.strip() for h in os.getenv("DB_REPLICA_HOSTS", "").split(",") if h.strip()]
+REPLICA_STRATEGY = os.getenv("DB_REPLICA_STRATEGY", "round_robin")  # oder "least_busy"
+
+replica_pools = [
+    ConnectionPool(
+        replica.connect,
+        ping=replica.ping,
+        name=f"replica-{host}",
+        **POOL_CONFIG
+    )
+    for host, replica in ((h, backend.replica(h)) for h in REPLICA_HOSTS)
+]
+_replica_counter = itertools.count()
+
+
+def replica_stats():
+    return [p.stats() for p in replica_pools]
+
+
+def _mark_primary_sticky():
+    # Nach einem Write liest der restliche Request nur noch vom Primary (keine veralteten Saldi)
+    if has_request_context():
+        g.db_primary_sticky = True
+
+
+def _use_primary():
+    if not replica_pools or current_transaction() is not None:
+        return True
+    return has_request_context() and g.get("db_primary_sticky", False)
+
+
+def _pick_replica():
+    if REPLICA_STRATEGY == "least_busy":
+        return min(replica_pools, key=lambda p: p.in_use)
+    return replica_pools[next(_replica_counter) % len(replica_pools)]
+
+
+def get_read_conn(primary=False):
+    """Connection für reine Lesezugriffe: Replica, ausser in einer Transaktion,
+    nach einem Write im selben Request oder mit primary=True."""
+    if primary or _use_primary():
+        return get_conn()
+    replica = _pick_replica()
+    try:
+        return replica.get_connection()
+    except Exception:
+        logger.warning("Replica %s nicht verfügbar, lese vom Primary", replica.name, exc_info=True)
+        return get_conn()
+
+
+# Ergebnis eines Writes innerhalb einer Transaktion
+WriteResult = namedtuple("WriteResult", ["lastrowid", "rowcount"])
+
+# Aktive Transaktion pro Thread (ein Request = ein Thread)
+_local = threading.local()
+
+
+class Transaction:
+    """Unit of Work: alle Statements laufen auf EINER Connection und werden
+    am Ende mit einem einzigen Commit geschrieben (siehe db_transaction)."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._after_commit = []
+
+    def after_commit(self, fn, *args):
+        """fn(*args) erst nach erfolgreichem Commit ausführen (ausserhalb der
+        Transaktion, die Connection ist dann schon zurück im Pool).
+        Derselbe Aufruf wird pro Transaktion nur einmal registriert."""
+        if (fn, args) not in self._after_commit:
+            self._after_commit.append((fn, args))
+
+    def read(self, sql, params=None, single=False):
+        cur = self.conn.cursor(dictionary=True, buffered=True)
+        try:
+            start = time.perf_counter()
+            cur.execute(sql, params or ())
+            if single:
+                row = cur.fetchone()
+                db_profiler.record(sql, params, time.perf_counter() - start, 1 if row else 0)
+                return row
+            rows = cur.fetchall()
+            db_profiler.record(sql, params, time.perf_counter() - start, len(rows))
+            return rows
+        finally:
+            cur.close()
+
+    def write(self, sql, params=None):
+        _mark_primary_sticky()
+        cur = self.conn.cursor()
+        try:
+            start = time.perf_counter()
+            cur.execute(sql, params or ())
+            db_profiler.record(sql, params, time.perf_counter() - start, cur.rowcount)
+            return WriteResult(cur.lastrowid, cur.rowcount)
+        finally:
+            cur.close()
+
+
+def current_transaction():
+    return getattr(_local, "tx", None)
+
+
+@contextmanager
+def db_transaction():
+    """Fuehrt alle Statements im with-Block auf einer Connection aus.
+
+    Commit beim Verlassen, Rollback (und Exception weiterreichen) bei Fehler.
+    db_read/db_write innerhalb des Blocks laufen automatisch mit; ein
+    verschachteltes db_transaction() haengt sich an die aeussere Transaktion.
+    """
+    outer = current_transaction()
+    if outer is not None:
+        yield outer
+        return
+
     conn = get_conn()
+    tx = Transaction(conn)
+    _local.tx = tx
+    try:
+        backend.begin(conn)
+        yield tx
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _local.tx = None
+        conn.close()
+
+    for fn, args in tx._after_commit:
+        try:
+            fn(*args)
+        except Exception:
+            # Die Transaktion ist bereits committet; Folgearbeiten dürfen sie nicht "scheitern" lassen
+            logger.exception("after_commit-Callback %s fehlgeschlagen", getattr(fn, "__name__", fn))
+
+
+# DB-Helper
+def db_read(sql, params=None, single=False, primary=False):
+    tx = current_transaction()
+    if tx is not None:
+        return tx.read(sql, params, single)
+
+    conn = get_read_conn(primary)
     try:
         cur = conn.cursor(dictionary=True)
+        start = time.perf_counter()
         cur.execute(sql, params or ())
 
         if single:
             # liefert EIN Dict oder None
             row = cur.fetchone()
+            db_profiler.record(sql, params, time.perf_counter() - start, 1 if row else 0)
             return row
         else:
             # liefert Liste von Dicts (evtl. [])
             rows = cur.fetchall()
+            db_profiler.record(sql, params, time.perf_counter() - start, len(rows))
             return rows
 
     finally:
@@ -40,14 +229,59 @@ def db_read(sql, params=None, single=False):
         conn.close()
 
 
+def db_stream(sql, params=None, batch_size=500, as_dict=True, primary=False):
+    """Generator über grosse Resultsets: ungepufferter Cursor + fetchmany.
+
+    Es liegen nie mehr als batch_size Zeilen im Speicher. Die Connection geht
+    zurück an den Pool, sobald der Generator erschöpft oder geschlossen ist.
+    as_dict=False liefert Tupel statt Dicts (spart Speicher bei vielen Zeilen).
+    Innerhalb einer Transaktion läuft der Stream auf deren Connection; dort
+    darf bis zum Ende des Streams kein anderes Statement laufen.
+    """
+    tx = current_transaction()
+    conn = tx.conn if tx is not None else get_read_conn(primary)
+    cur = None
+    rows = 0
+    start = time.perf_counter()
+    try:
+        cur = conn.cursor(dictionary=as_dict, buffered=False)
+        cur.execute(sql, params or ())
+        while True:
+            batch = cur.fetchmany(batch_size)
+            if not batch:
+                break
+            rows += len(batch)
+            yield from batch
+    finally:
+        db_profiler.record(sql, params, time.perf_counter() - start, rows)
+        try:
+            # Bei vorzeitigem Abbruch Restzeilen verwerfen, sonst ist die Connection blockiert
+            if getattr(conn, "unread_result", False):
+                conn.consume_results()
+            cur.close()
+        except:
+            pass
+        if tx is None:
+            conn.close()
+
+
 def db_write(sql, params=None):
+    tx = current_transaction()
+    if tx is not None:
+        # Fehler nicht schlucken, sonst wird nur ein Teil der Transaktion committet
+        tx.write(sql, params)
+        return True
+
+    _mark_primary_sticky()
     conn = get_conn()
     try:
         cur = conn.cursor()
+        start = time.perf_counter()
         cur.execute(sql, params or ())
         conn.commit()
+        db_profiler.record(sql, params, time.perf_counter() - start, cur.rowcount)
         return True
-    except Exception as e:
+    except Exception:
         conn.rollback()
         return False
     finally:
@@ -55,4 +289,44 @@ def db_write(sql, params=None):
             cur.close()
         except:
             pass
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+
+_VALUES_RE = re.compile(r"\bVALUES\s*(\(.*\))\s*$", re.IGNORECASE | re.DOTALL)
+_INSERT_RE = re.compile(r"^\s*INSERT\s+", re.IGNORECASE)
+
+
+def db_write_many(sql, rows, chunk_size=None, ignore=False, on_duplicate=None):
+    """Viele Zeilen mit wenigen Multi-Row-INSERTs schreiben.
+
+    sql ist ein normales Einzel-INSERT ("INSERT INTO t (a, b) VALUES (%s, %s)"),
+    rows eine Liste von Parameter-Tupeln. Pro chunk_size Zeilen wird ein
+    Statement abgesetzt, alles in einer Transaktion.
+    ignore=True -> INSERT IGNORE (Duplikate auf UNIQUE-Keys werden übersprungen),
+    on_duplicate="spalte=VALUES(spalte)" -> Upsert.
+    Gibt die Anzahl eingefügter Zeilen zurück (bei Upserts zählt MySQL
+    aktualisierte Zeilen doppelt).
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    match = _VALUES_RE.search(sql)
+    if not match:
+        raise ValueError("db_write_many erwartet ein INSERT ... VALUES (...)")
+    head = sql[:match.start(1)]
+    group = match.group(1)
+    if ignore:
+        head = _INSERT_RE.sub("INSERT IGNORE ", head, count=1)
+    chunk_size = chunk_size or WRITE_MANY_CHUNK_SIZE
+
+    inserted = 0
+    with db_transaction() as tx:
+        for i in range(0, len(rows), chunk_size):
+            chunk = rows[i:i + chunk_size]
+            statement = head + ", ".join([group] * len(chunk))
+            if on_duplicate:
+                statement += " ON DUPLICATE KEY UPDATE " + on_duplicate
+            params = [value for row in chunk for value in row]
+            inserted += tx.write(statement, params).rowcount
+    return inserted
@@ -5,6 +5,7 @@ CREATE TABLE users (
     tutorial_seen_blackjack BOOLEAN DEFAULT FALSE,
     tutorial_seen_roulette BOOLEAN DEFAULT FALSE,
     password VARCHAR(255) NOT NULL,
+    activity_version INT NOT NULL DEFAULT 0,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -20,10 +21,21 @@ CREATE TABLE wallets (
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL UNIQUE,
     balance DECIMAL(10, 2) DEFAULT 1000.00,
+    best_balance DECIMAL(10, 2) DEFAULT 1000.00,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id)
 );
 
+CREATE TABLE balance_history (
+    user_id INT NOT NULL,
+    bucket DATETIME NOT NULL,
+    balance DECIMAL(10, 2) NOT NULL,
+    high DECIMAL(10, 2) NOT NULL,
+    low DECIMAL(10, 2) NOT NULL,
+    PRIMARY KEY (user_id, bucket),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
 CREATE TABLE blackjack_sessions (
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL,
@@ -33,9 +45,64 @@ CREATE TABLE blackjack_sessions (
     result VARCHAR(50),
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     finished BOOLEAN DEFAULT FALSE,
+    player_total INT NULL,
+    dealer_total INT NULL,
+    card_count INT NULL,
+    is_natural BOOLEAN NOT NULL DEFAULT FALSE,
+    payout DECIMAL(10, 2) NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE TABLE user_game_stats (
+    user_id INT PRIMARY KEY,
+    bj_total INT NOT NULL DEFAULT 0,
+    bj_wins INT NOT NULL DEFAULT 0,
+    bj_losses INT NOT NULL DEFAULT 0,
+    bj_pushes INT NOT NULL DEFAULT 0,
+    ru_total INT NOT NULL DEFAULT 0,
+    ru_wins INT NOT NULL DEFAULT 0,
+    ru_losses INT NOT NULL DEFAULT 0,
+    current_streak INT NOT NULL DEFAULT 0,
+    max_streak INT NOT NULL DEFAULT 0,
+    achievements BIGINT NOT NULL DEFAULT 0,
+    xp_total INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE TABLE challenge_progress (
+    user_id INT NOT NULL,
+    scope VARCHAR(30) NOT NULL,
+    period VARCHAR(10) NOT NULL,
+    games INT NOT NULL DEFAULT 0,
+    wins INT NOT NULL DEFAULT 0,
+    blackjacks INT NOT NULL DEFAULT 0,
+    black_wins INT NOT NULL DEFAULT 0,
+    color_wins INT NOT NULL DEFAULT 0,
+    current_streak INT NOT NULL DEFAULT 0,
+    max_streak INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, scope, period),
     FOREIGN KEY (user_id) REFERENCES users(id)
 );
 
+CREATE TABLE blackjack_shoes (
+    user_id INT PRIMARY KEY,
+    decks INT NOT NULL,
+    cards BLOB NOT NULL,
+    position INT NOT NULL DEFAULT 0,
+    cut INT NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE TABLE leaderboard_entries (
+    board VARCHAR(20) NOT NULL,
+    position INT NOT NULL,
+    user_id INT NOT NULL,
+    username VARCHAR(255) NOT NULL,
+    score DECIMAL(12, 2) NOT NULL,
+    refreshed_at DATETIME NOT NULL,
+    PRIMARY KEY (board, position)
+);
+
 CREATE TABLE transactions (
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL,
@@ -64,6 +131,7 @@ CREATE TABLE xp_rewards (
     user_id INT NOT NULL,
     amount INT NOT NULL,
     source VARCHAR(50),
+    award_key VARCHAR(100),
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id)
 );
@@ -76,4 +144,38 @@ CREATE TABLE lucky_wheel_spins (
     cost DECIMAL(10, 2) DEFAULT 0.00,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id)
-);
\ No newline at end of file
+);
+
+CREATE UNIQUE INDEX uq_xp_rewards_award_key ON xp_rewards (user_id, award_key);
+CREATE INDEX idx_bj_user_finished_created ON blackjack_sessions (user_id, finished, created_at, result);
+CREATE INDEX idx_ru_user_created ON roulette_sessions (user_id, created_at, win);
+CREATE INDEX idx_tx_user_created ON transactions (user_id, created_at, amount);
+CREATE INDEX idx_lw_user_cost_created ON lucky_wheel_spins (user_id, cost, created_at);
+CREATE INDEX idx_bj_user_finished_created_id ON blackjack_sessions (user_id, finished, created_at, id);
+CREATE INDEX idx_ru_user_created_id ON roulette_sessions (user_id, created_at, id);
+CREATE INDEX idx_lw_user_created_id ON lucky_wheel_spins (user_id, created_at, id);
+CREATE INDEX idx_bj_user_natural_created ON blackjack_sessions (user_id, is_natural, created_at, player_total, dealer_total);
+
+-- Dieses Skript entspricht allen Migrationen in db/migrations bis einschliesslich 0015
+CREATE TABLE schema_migrations (
+    version VARCHAR(20) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO schema_migrations (version, name) VALUES
+    ('0001', 'baseline'),
+    ('0002', 'xp_award_key'),
+    ('0003', 'wallet_best_balance'),
+    ('0004', 'user_game_stats'),
+    ('0005', 'leaderboard_entries'),
+    ('0006', 'hot_query_indexes'),
+    ('0007', 'user_streaks'),
+    ('0008', 'activity_version'),
+    ('0009', 'challenge_progress'),
+    ('0010', 'achievement_bits'),
+    ('0011', 'xp_total'),
+    ('0012', 'history_indexes'),
+    ('0013', 'blackjack_shoes'),
+    ('0014', 'blackjack_outcomes'),
+    ('0015', 'drop_unused_indexes');
@@ -0,0 +1,16 @@
+-- Einmalige XP-Belohnungen: award_key, eindeutig pro User
+ALTER TABLE xp_rewards ADD COLUMN award_key VARCHAR(100);
+-- Bestand: einmalige Belohnungen liefen über source (achievement.<id>, daily.<id>.<datum>).
+-- Doppelte Zeilen (Check-then-Insert ohne Sperre) entfernen, die älteste bleibt,
+-- dann source als award_key übernehmen, sonst greift der Unique-Index für sie nicht
+DELETE FROM xp_rewards
+WHERE (source LIKE 'achievement.%' OR source LIKE 'daily.%')
+  AND id NOT IN (
+      SELECT keep_id FROM (
+          SELECT MIN(id) AS keep_id FROM xp_rewards
+          WHERE source LIKE 'achievement.%' OR source LIKE 'daily.%'
+          GROUP BY user_id, source
+      ) AS keep_rows
+  );
+UPDATE xp_rewards SET award_key = source WHERE source LIKE 'achievement.%' OR source LIKE 'daily.%';
+CREATE UNIQUE INDEX uq_xp_rewards_award_key ON xp_rewards (user_id, award_key);
@@ -0,0 +1,14 @@
+-- Höchststand auf der Wallet und Saldo-Historie pro Bucket
+-- Danach: flask --app flask_app backfill-wallets
+ALTER TABLE wallets ADD COLUMN best_balance DECIMAL(10, 2) DEFAULT 1000.00;
+UPDATE wallets SET best_balance = balance;
+
+CREATE TABLE balance_history (
+    user_id INT NOT NULL,
+    bucket DATETIME NOT NULL,
+    balance DECIMAL(10, 2) NOT NULL,
+    high DECIMAL(10, 2) NOT NULL,
+    low DECIMAL(10, 2) NOT NULL,
+    PRIMARY KEY (user_id, bucket),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
@@ -0,0 +1,13 @@
+-- Spielzähler pro User
+-- Danach: flask --app flask_app backfill-game-stats
+CREATE TABLE user_game_stats (
+    user_id INT PRIMARY KEY,
+    bj_total INT NOT NULL DEFAULT 0,
+    bj_wins INT NOT NULL DEFAULT 0,
+    bj_losses INT NOT NULL DEFAULT 0,
+    bj_pushes INT NOT NULL DEFAULT 0,
+    ru_total INT NOT NULL DEFAULT 0,
+    ru_wins INT NOT NULL DEFAULT 0,
+    ru_losses INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
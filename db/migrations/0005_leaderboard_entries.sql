@@ -0,0 +1,10 @@
+-- Vorberechnete Ranglisten
+CREATE TABLE leaderboard_entries (
+    board VARCHAR(20) NOT NULL,
+    position INT NOT NULL,
+    user_id INT NOT NULL,
+    username VARCHAR(255) NOT NULL,
+    score DECIMAL(12, 2) NOT NULL,
+    refreshed_at DATETIME NOT NULL,
+    PRIMARY KEY (board, position)
+);
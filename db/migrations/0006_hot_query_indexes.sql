@@ -0,0 +1,18 @@
+-- Indizes für die häufigsten Abfragen (Prüfung: flask --app flask_app check-indexes)
+
+-- Spielverlauf (user_id, finished ORDER BY created_at) und Daily Challenges (created_at >= ...)
+CREATE INDEX idx_bj_user_finished_created ON blackjack_sessions (user_id, finished, created_at, result);
+
+-- Spielverlauf und Daily Challenges; win macht den Index deckend
+CREATE INDEX idx_ru_user_created ON roulette_sessions (user_id, created_at, win);
+-- Event-Zähler (bet_type, win, Zeitraum); bet_value wird aus dem Index gefiltert
+CREATE INDEX idx_ru_user_bet_win_created ON roulette_sessions (user_id, bet_type, win, created_at, bet_value);
+
+-- Ledger pro User in zeitlicher Reihenfolge (Backfill, Summen)
+CREATE INDEX idx_tx_user_created ON transactions (user_id, created_at, amount);
+
+-- Bonus-XP pro User (SUM) und Abfragen nach Quelle
+CREATE INDEX idx_xp_user_source ON xp_rewards (user_id, source, amount);
+
+-- Letzter Gratis-Spin (cost=0 ORDER BY created_at DESC LIMIT 1)
+CREATE INDEX idx_lw_user_cost_created ON lucky_wheel_spins (user_id, cost, created_at);
@@ -0,0 +1,4 @@
+-- Aktuelle und längste Siegesserie pro User
+-- Danach: flask --app flask_app backfill-game-stats
+ALTER TABLE user_game_stats ADD COLUMN current_streak INT NOT NULL DEFAULT 0;
+ALTER TABLE user_game_stats ADD COLUMN max_streak INT NOT NULL DEFAULT 0;
@@ -0,0 +1,2 @@
+-- Aktivitätsversion pro User (Cache-Key für /stats, siehe activity.py)
+ALTER TABLE users ADD COLUMN activity_version INT NOT NULL DEFAULT 0;
@@ -0,0 +1,16 @@
+-- Fortschritt der Tages- und Event-Challenges pro User und Zeitraum (siehe challenges.py)
+-- scope: "daily" oder Event-ID, period: Tag bzw. Starttag des Event-Fensters
+CREATE TABLE challenge_progress (
+    user_id INT NOT NULL,
+    scope VARCHAR(30) NOT NULL,
+    period VARCHAR(10) NOT NULL,
+    games INT NOT NULL DEFAULT 0,
+    wins INT NOT NULL DEFAULT 0,
+    blackjacks INT NOT NULL DEFAULT 0,
+    black_wins INT NOT NULL DEFAULT 0,
+    color_wins INT NOT NULL DEFAULT 0,
+    current_streak INT NOT NULL DEFAULT 0,
+    max_streak INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, scope, period),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
@@ -0,0 +1,3 @@
+-- Freigeschaltete Achievements als Bitmaske (Bits siehe achievements.py)
+-- Danach: flask --app flask_app backfill-achievements
+ALTER TABLE user_game_stats ADD COLUMN achievements BIGINT NOT NULL DEFAULT 0;
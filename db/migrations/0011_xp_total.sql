@@ -0,0 +1,3 @@
+-- Laufende XP-Summe pro User (Runden, Siege und alle xp_rewards, siehe xp.py)
+-- Danach: flask --app flask_app backfill-xp
+ALTER TABLE user_game_stats ADD COLUMN xp_total INT NOT NULL DEFAULT 0;
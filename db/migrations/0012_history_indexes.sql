@@ -0,0 +1,4 @@
+-- Spielverlauf (/api/history): pro Spiel nach (created_at, id) absteigend lesen, ohne Filesort
+CREATE INDEX idx_bj_user_finished_created_id ON blackjack_sessions (user_id, finished, created_at, id);
+CREATE INDEX idx_ru_user_created_id ON roulette_sessions (user_id, created_at, id);
+CREATE INDEX idx_lw_user_created_id ON lucky_wheel_spins (user_id, created_at, id);
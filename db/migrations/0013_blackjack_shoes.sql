@@ -0,0 +1,9 @@
+-- Blackjack-Schuh pro User (siehe blackjack_engine.Shoe): ein Byte pro Karte, Position und Cut Card
+CREATE TABLE blackjack_shoes (
+    user_id INT PRIMARY KEY,
+    decks INT NOT NULL,
+    cards BLOB NOT NULL,
+    position INT NOT NULL DEFAULT 0,
+    cut INT NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
@@ -0,0 +1,11 @@
+-- Beim Abrechnen abgeleitete Spalten, damit niemand mehr player_hand parsen muss
+-- card_count = Karten des Spielers, is_natural = Blackjack mit zwei Karten
+-- Danach: flask --app flask_app backfill-blackjack-outcomes
+ALTER TABLE blackjack_sessions ADD COLUMN player_total INT NULL;
+ALTER TABLE blackjack_sessions ADD COLUMN dealer_total INT NULL;
+ALTER TABLE blackjack_sessions ADD COLUMN card_count INT NULL;
+ALTER TABLE blackjack_sessions ADD COLUMN is_natural BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE blackjack_sessions ADD COLUMN payout DECIMAL(10, 2) NULL;
+
+-- "Schon einmal Blackjack?" (EXISTS) und Naturals in einem Zeitraum; die Totals machen den Index deckend
+CREATE INDEX idx_bj_user_natural_created ON blackjack_sessions (user_id, is_natural, created_at, player_total, dealer_total);
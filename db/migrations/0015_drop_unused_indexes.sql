@@ -0,0 +1,4 @@
+-- Indizes ohne Abfrage mehr: die Event-Zähler laufen über challenge_progress,
+-- Bonus-XP über user_game_stats.xp_total und einmalige XP über award_key
+DROP INDEX idx_ru_user_bet_win_created ON roulette_sessions;
+DROP INDEX idx_xp_user_source ON xp_rewards;
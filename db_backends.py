@@ -0,0 +1,288 @@
+import logging
+import os
+import re
+import sqlite3
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db", "TODOS.sql")
+
+
+class MySQLBackend:
+    """Produktiv-Backend: mysql-connector, Konfiguration aus DB_CONFIG."""
+
+    name = "mysql"
+    max_connections = None
+    explain_prefix = "EXPLAIN "
+
+    def __init__(self, config):
+        self.config = config
+
+    def connect(self):
+        import mysql.connector
+        from mysql.connector.constants import ClientFlag
+        # FOUND_ROWS: rowcount eines UPDATE = getroffene statt geänderte Zeilen
+        # (wie bei SQLite), sonst wirkt ein Update mit Delta 0 wie "nichts gefunden"
+        return mysql.connector.connect(client_flags=[ClientFlag.FOUND_ROWS], **self.config)
+
+    def ping(self, conn):
+        return conn.is_connected()
+
+    def replica(self, host):
+        config = dict(self.config)
+        config["user"] = os.getenv("DB_REPLICA_USER") or self.config["user"]
+        config["password"] = os.getenv("DB_REPLICA_PASSWORD") or self.config["password"]
+        if ":" in host:
+            host, port = host.rsplit(":", 1)
+            config["port"] = int(port)
+        config["host"] = host
+        return MySQLBackend(config)
+
+    def translate_ddl(self, sql):
+        return sql
+
+    def begin(self, conn):
+        # autocommit ist aus: die erste Anweisung startet die Transaktion,
+        # SELECT ... FOR UPDATE sperrt die gelesenen Zeilen
+        pass
+
+    def full_scans(self, plan):
+        # type ALL = Table-Scan, index = Scan über den ganzen Index;
+        # <union1,2> & Co. sind Temp-Tabellen des UNION, die zählen nicht
+        return [
+            r["table"] for r in plan
+            if r.get("type") in ("ALL", "index") and not str(r.get("table") or "").startswith("<")
+        ]
+
+
+# SQLite (lokale Last-/Profiling-Tests ohne MySQL-Server)
+
+_QUERY_RULES = [
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.IGNORECASE), "INSERT OR IGNORE"),
+    (re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.IGNORECASE), "ON CONFLICT DO UPDATE SET"),
+    (re.compile(r"\bVALUES\((\w+)\)", re.IGNORECASE), r"excluded.\1"),
+    (re.compile(r"\bGREATEST\(", re.IGNORECASE), "MAX("),
+    (re.compile(r"\bLEAST\(", re.IGNORECASE), "MIN("),
+    # SQLite kennt keine Zeilensperren; db_transaction() startet dort mit BEGIN IMMEDIATE,
+    # d.h. jede Transaktion hält von Anfang an die Schreibsperre der ganzen Datenbank
+    (re.compile(r"\s+FOR\s+UPDATE\b", re.IGNORECASE), ""),
+]
+
+_PLAN_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+_PLAN_SUBQUERY = re.compile(r"^(?:CO-ROUTINE|MATERIALIZE) (\w+)")
+
+_SCHEMA_RULES = [
+    (re.compile(r"\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", re.IGNORECASE), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bJSON\b"), "TEXT"),
+    # MySQL: DROP INDEX name ON tabelle; SQLite kennt nur DROP INDEX name
+    (re.compile(r"\b(DROP\s+INDEX\s+\w+)\s+ON\s+\w+", re.IGNORECASE), r"\1"),
+]
+
+
+@lru_cache(maxsize=1024)
+def translate_sql(sql):
+    """MySQL-Dialekt der App -> SQLite (Platzhalter, INSERT IGNORE, Upserts, ...)."""
+    for pattern, repl in _QUERY_RULES:
+        sql = pattern.sub(repl, sql)
+    return sql
+
+
+def translate_schema(script):
+    """DDL aus db/TODOS.sql für SQLite umschreiben."""
+    for pattern, repl in _SCHEMA_RULES:
+        script = pattern.sub(repl, script)
+    return script
+
+
+def _convert_datetime(value):
+    text = value.decode()
+    for fmt in ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return text
+
+
+def _convert_decimal(value):
+    # DECIMAL(10, 2) wie bei MySQL als Decimal mit 2 Nachkommastellen liefern
+    return Decimal(value.decode()).quantize(Decimal("0.01"))
+
+
+sqlite3.register_adapter(datetime, lambda v: v.isoformat(sep=" ", timespec="seconds"))
+sqlite3.register_adapter(date, lambda v: v.isoformat())
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_converter("DATETIME", _convert_datetime)
+sqlite3.register_converter("DECIMAL", _convert_decimal)
+
+
+class SQLiteCursor:
+    """Cursor mit der Schnittstelle, die db.py von mysql-connector nutzt."""
+
+    def __init__(self, raw, dictionary=False):
+        self._raw = raw
+        self._dictionary = dictionary
+
+    def execute(self, sql, params=()):
+        self._raw.execute(translate_sql(sql), tuple(params or ()))
+
+    def executemany(self, sql, seq_of_params):
+        self._raw.executemany(translate_sql(sql), [tuple(p) for p in seq_of_params])
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {col[0]: value for col, value in zip(self._raw.description, row)}
+
+    def fetchone(self):
+        return self._row(self._raw.fetchone())
+
+    def fetchmany(self, size=None):
+        rows = self._raw.fetchmany(size or self._raw.arraysize)
+        return [self._row(r) for r in rows] if self._dictionary else rows
+
+    def fetchall(self):
+        rows = self._raw.fetchall()
+        return [self._row(r) for r in rows] if self._dictionary else rows
+
+    @property
+    def lastrowid(self):
+        return self._raw.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    @property
+    def description(self):
+        return self._raw.description
+
+    def close(self):
+        self._raw.close()
+
+
+class SQLiteConnection:
+    unread_result = False
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def cursor(self, dictionary=False, buffered=True):
+        return SQLiteCursor(self._raw.cursor(), dictionary)
+
+    def begin(self):
+        # isolation_level=None: sqlite3 startet keine eigenen Transaktionen (erst vor
+        # DML, also nach einem SELECT ... FOR UPDATE); hier sofort mit Schreibsperre
+        self._raw.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+    def is_connected(self):
+        try:
+            self._raw.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+
+class SQLiteBackend:
+    """Eingebettetes Backend: Datei (DB_SQLITE_PATH=casino.db) oder In-Memory (":memory:").
+
+    Das Schema wird beim ersten Verbinden aus db/TODOS.sql angelegt, falls es fehlt.
+    In-Memory nutzt eine Shared-Cache-DB, die eine Anker-Connection am Leben hält;
+    wegen der Tabellen-Locks im Shared Cache wird der Pool dort auf 1 Connection begrenzt.
+    """
+
+    name = "sqlite"
+    explain_prefix = "EXPLAIN QUERY PLAN "
+
+    def __init__(self, path=":memory:", init_schema=True):
+        self.path = path
+        self.memory = path == ":memory:"
+        self.max_connections = 1 if self.memory else None
+        self._init_schema = init_schema
+        self._anchor = None
+        if self.memory:
+            self._target = f"file:casino_{id(self)}?mode=memory&cache=shared"
+        else:
+            self._target = path
+
+    def _open(self):
+        raw = sqlite3.connect(
+            self._target,
+            uri=self.memory,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+            timeout=30,
+            isolation_level=None,
+        )
+        raw.execute("PRAGMA foreign_keys = ON")
+        if not self.memory:
+            raw.execute("PRAGMA journal_mode = WAL")
+        return raw
+
+    def connect(self):
+        if self._anchor is None:
+            self._anchor = self._open()
+            if self._init_schema:
+                self._ensure_schema(self._anchor)
+        return SQLiteConnection(self._open())
+
+    def _ensure_schema(self, raw):
+        exists = raw.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='users'"
+        ).fetchone()
+        if exists:
+            return
+        with open(SCHEMA_PATH, encoding="utf-8") as f:
+            raw.executescript(translate_schema(f.read()))
+        raw.commit()
+        logger.info("SQLite-Schema aus %s angelegt (%s)", SCHEMA_PATH, self.path)
+
+    def ping(self, conn):
+        return conn.is_connected()
+
+    def translate_ddl(self, sql):
+        return translate_schema(sql)
+
+    def begin(self, conn):
+        conn.begin()
+
+    def full_scans(self, plan):
+        # "SCAN t" bzw. "SCAN t USING [COVERING] INDEX ..." = ganze Tabelle/Index gelesen,
+        # "SEARCH t USING INDEX ..." = Zugriff über den Index;
+        # Unterabfragen (CO-ROUTINE/MATERIALIZE x) zählen wie <derived> bei MySQL nicht
+        subqueries = {m.group(1) for m in map(_PLAN_SUBQUERY.match, (r["detail"] for r in plan)) if m}
+        scans = []
+        for r in plan:
+            m = _PLAN_SCAN.match(r["detail"])
+            if m and m.group(1) != "CONSTANT" and m.group(1) not in subqueries:
+                scans.append(m.group(1))
+        return scans
+
+    def replica(self, host):
+        # Replica-Stand-in: eine weitere SQLite-Datei (DB_REPLICA_HOSTS=pfad1.db,pfad2.db)
+        return SQLiteBackend(host, init_schema=self._init_schema)
+
+
+def create_backend(name, config):
+    if name == "mysql":
+        return MySQLBackend(config)
+    if name == "sqlite":
+        return SQLiteBackend(
+            os.getenv("DB_SQLITE_PATH", ":memory:"),
+            init_schema=os.getenv("DB_SQLITE_INIT_SCHEMA", "1") == "1",
+        )
+    raise ValueError(f"Unbekanntes DB_BACKEND: {name}")
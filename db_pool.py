@@ -0,0 +1,172 @@
+import logging
+import threading
+import time
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
+
+
+class PoolExhausted(Exception):
+    """Keine Connection innerhalb des Timeouts frei (oder Warteschlange voll)."""
+
+
+class PooledConnection:
+    """Dünner Wrapper um eine echte Connection: close() gibt sie an den Pool zurück."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        if self._raw is None:
+            return
+        raw, self._raw = self._raw, None
+        self._pool._release(raw)
+
+
+class ConnectionPool:
+    """Connection-Pool mit Warteschlange, Overflow und Liveness-Check.
+
+    - size: Connections, die offen gehalten werden
+    - max_overflow: zusätzliche Connections unter Last, werden nach Gebrauch geschlossen
+    - timeout: so lange (Sekunden) wartet get_connection() auf eine freie Connection
+    - max_waiters: maximale Anzahl wartender Threads (0 = unbegrenzt)
+    - ping: Funktion conn -> bool, wird beim Auschecken aufgerufen (pre_ping)
+    """
+
+    def __init__(self, factory, size=5, max_overflow=0, timeout=10.0, max_waiters=0,
+                 ping=None, pre_ping=True, name="pool"):
+        self.name = name
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.max_waiters = max_waiters
+        self._factory = factory
+        self._ping = ping
+        self._pre_ping = pre_ping and ping is not None
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._open = 0
+        self._in_use = 0
+        self._waiting = 0
+
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._peak_in_use = 0
+        self._exhausted = 0
+        self._overflow_created = 0
+        self._dead = 0
+
+    @property
+    def in_use(self):
+        return self._in_use
+
+    def get_connection(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        raw = None
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    raw = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    if self._open >= self.size:
+                        self._overflow_created += 1
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or (self.max_waiters and self._waiting >= self.max_waiters):
+                    self._exhausted += 1
+                    logger.warning(
+                        "Pool '%s' erschöpft (in_use=%s, waiting=%s)",
+                        self.name, self._in_use, self._waiting,
+                    )
+                    raise PoolExhausted(f"pool '{self.name}' exhausted")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+
+        try:
+            if raw is not None and self._pre_ping and not self._alive(raw):
+                with self._cond:
+                    self._dead += 1
+                self._close_raw(raw)
+                raw = None
+            if raw is None:
+                raw = self._factory()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return PooledConnection(self, raw)
+
+    def _alive(self, raw):
+        try:
+            return bool(self._ping(raw))
+        except Exception:
+            return False
+
+    def _close_raw(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _release(self, raw):
+        # Offene (Lese-)Transaktion verwerfen, sonst sieht der nächste Request einen alten Snapshot
+        try:
+            raw.rollback()
+            healthy = True
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy and self._open <= self.size:
+                self._idle.append(raw)
+                raw = None
+            else:
+                self._open -= 1
+            self._cond.notify()
+
+        if raw is not None:
+            self._close_raw(raw)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "name": self.name,
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "peak_in_use": self._peak_in_use,
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "wait_total_ms": round(self._wait_total * 1000, 2),
+                "wait_avg_ms": round(self._wait_total * 1000 / self._checkouts, 3) if self._checkouts else 0,
+                "wait_max_ms": round(self._wait_max * 1000, 2),
+                "exhausted": self._exhausted,
+                "overflow_created": self._overflow_created,
+                "dead_connections": self._dead,
+            }
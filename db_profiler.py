@@ -0,0 +1,104 @@
+import logging
+import os
+import re
+from dotenv import load_dotenv
+from flask import g, has_request_context, request
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
+
+# Load .env variables
+load_dotenv()
+
+# Profiler-Einstellungen (.env)
+PROFILE_ENABLED = os.getenv("DB_PROFILE", "0") == "1"
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+NPLUS1_THRESHOLD = int(os.getenv("DB_NPLUS1_THRESHOLD", "10"))
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """Literale und Platzhalter durch '?' ersetzen, damit gleiche Statements gleich aussehen."""
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _IN_LIST_RE.sub("(?+)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+class QueryProfile:
+    """Sammelt alle Statements eines Requests (liegt auf flask.g.db_profile)."""
+
+    def __init__(self):
+        self.queries = []
+
+    def add(self, sql, params, duration_ms, rows):
+        self.queries.append({
+            "sql": normalize_sql(sql),
+            "params": len(params or ()),
+            "duration_ms": round(duration_ms, 3),
+            "rows": rows,
+        })
+
+    def summary(self):
+        grouped = {}
+        for q in self.queries:
+            entry = grouped.setdefault(q["sql"], {"sql": q["sql"], "count": 0, "duration_ms": 0.0, "rows": 0})
+            entry["count"] += 1
+            entry["duration_ms"] += q["duration_ms"]
+            entry["rows"] += q["rows"] or 0
+
+        statements = sorted(grouped.values(), key=lambda x: x["duration_ms"], reverse=True)
+        for s in statements:
+            s["duration_ms"] = round(s["duration_ms"], 3)
+        return {
+            "queries": len(self.queries),
+            "duration_ms": round(sum(q["duration_ms"] for q in self.queries), 3),
+            "rows": sum(q["rows"] or 0 for q in self.queries),
+            "statements": statements,
+            "n_plus_one": [s for s in statements if s["count"] > NPLUS1_THRESHOLD],
+        }
+
+
+def record(sql, params, duration, rows):
+    """Wird von db.py nach jedem Statement aufgerufen (duration in Sekunden)."""
+    if not PROFILE_ENABLED:
+        return
+    duration_ms = duration * 1000
+    if duration_ms >= SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query (%.1f ms, %s rows, %s params): %s",
+            duration_ms, rows, len(params or ()), normalize_sql(sql),
+        )
+    if not has_request_context():
+        return
+    profile = g.get("db_profile")
+    if profile is None:
+        profile = g.db_profile = QueryProfile()
+    profile.add(sql, params, duration_ms, rows)
+
+
+def init_app(app):
+    """Hängt die Auswertung an jeden Request (Warnung bei N+1, Header im Debug-Modus)."""
+
+    @app.after_request
+    def _db_profile_after_request(response):
+        profile = g.get("db_profile")
+        if profile is None:
+            return response
+        summary = g.db_profile_summary = profile.summary()
+        for s in summary["n_plus_one"]:
+            logger.warning(
+                "Mögliches N+1 in %s: %sx %s",
+                request.path, s["count"], s["sql"],
+            )
+        if app.debug:
+            response.headers["X-DB-Profile"] = (
+                f"queries={summary['queries']}; time_ms={summary['duration_ms']}; "
+                f"rows={summary['rows']}; n_plus_one={len(summary['n_plus_one'])}"
+            )
+        return response
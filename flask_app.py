@@ -1,14 +1,32 @@
-from flask import Flask, redirect, render_template, request, url_for, jsonify
-from datetime import datetime, date, timedelta
+from flask import Flask, redirect, render_template, request, url_for, jsonify, make_response
+from datetime import datetime, date, timedelta, timezone
 from dotenv import load_dotenv
 import os
 import git
 import hmac
 import hashlib
 import json
-from db import db_read, db_write
+import time
+import click
+from db import db_read, db_write, db_transaction, pool_stats, replica_stats
+import db_profiler
+import activity
+import cache
 from auth import login_manager, authenticate, register_user
-from blackjack_engine import BlackjackGame, hand_value, create_deck
+import achievements
+import blackjack_odds
+import challenges
+import game_stats
+import history
+import leaderboard
+import live_sessions
+import migrations
+import roulette_engine
+import simulator
+import wallet
+import xp
+from wallet import InsufficientFunds, InvalidAmount
+from blackjack_engine import PAYOUTS
 from werkzeug.security import generate_password_hash, check_password_hash
 import random
 from flask_login import login_user, logout_user, login_required, current_user
@@ -33,6 +51,15 @@ app.secret_key = SECRET_KEY or "supersecret"
 login_manager.init_app(app)
 login_manager.login_view = "login"
 
+# DB-Profiler (aktiv mit DB_PROFILE=1)
+db_profiler.init_app(app)
+
+
+# Hint-Tabellen beim ersten Request des Workers im Hintergrund laden (nicht bei CLI-Befehlen)
+@app.before_request
+def _warm_up_blackjack_odds():
+    blackjack_odds.warm_up()
+
 # DON'T CHANGE
 def is_valid_signature(x_hub_signature, data, private_key):
     if not x_hub_signature or not private_key:
@@ -58,6 +85,14 @@ def webhook():
         return 'Updated PythonAnywhere successfully', 200
     return 'Unathorized', 401
 
+@app.route("/health/db", methods=["GET"])
+def health_db():
+    """Pool-Auslastung für Monitoring / Worker-Sizing"""
+    stats = pool_stats()
+    saturated = stats["in_use"] >= stats["size"] + stats["max_overflow"] and stats["waiting"] > 0
+    ok = not saturated
+    return jsonify({"ok": ok, "pool": stats, "replicas": replica_stats()}), 200 if ok else 503
+
 # Auth routes
 @app.route("/login", methods=["GET", "POST"])
 def login():
@@ -144,13 +179,13 @@ def index():
 @login_required
 def blackjack():
     """Show blackjack page with wallet balance"""
-    wallet = db_read("SELECT balance FROM wallets WHERE user_id=%s", (current_user.id,), single=True)
-    if not wallet:
+    wallet_row = db_read("SELECT balance FROM wallets WHERE user_id=%s", (current_user.id,), single=True)
+    if not wallet_row:
         # Create wallet if doesn't exist
-        db_write("INSERT INTO wallets (user_id, balance) VALUES (%s, 1000.00)", (current_user.id,))
+        wallet.create_wallet(current_user.id, 1000.00)
         balance = 1000.00
     else:
-        balance = float(wallet["balance"])
+        balance = float(wallet_row["balance"])
     
     show_tutorial = not bool(getattr(current_user, "tutorial_seen_blackjack", False))
     return render_template("blackjack.html", balance=balance, show_tutorial=show_tutorial)
@@ -162,12 +197,7 @@ def deposit():
     error = None
     success = None
 
-    wallet = db_read("SELECT balance FROM wallets WHERE user_id=%s", (current_user.id,), single=True)
-    if not wallet:
-        db_write("INSERT INTO wallets (user_id, balance) VALUES (%s, 0.00)", (current_user.id,))
-        balance = 0.00
-    else:
-        balance = float(wallet["balance"])
+    balance = wallet.get_balance(current_user.id)
 
     if request.method == "POST":
         amount_raw = request.form.get("amount", "0")
@@ -176,17 +206,11 @@ def deposit():
         except ValueError:
             amount = 0
 
-        if amount <= 0:
-            error = "Please enter a valid amount."
-        else:
-            new_balance = balance + amount
-            db_write("UPDATE wallets SET balance=%s WHERE user_id=%s", (new_balance, current_user.id))
-            db_write(
-                "INSERT INTO transactions (user_id, amount, type, description) VALUES (%s, %s, %s, %s)",
-                (current_user.id, amount, "deposit", "Demo top-up")
-            )
-            balance = new_balance
+        try:
+            balance = wallet.credit(current_user.id, amount, "deposit", "Demo top-up")
             success = "Funds added successfully (demo)."
+        except InvalidAmount:
+            error = "Please enter a valid amount."
 
     return render_template("deposit.html", balance=balance, error=error, success=success)
 
@@ -211,85 +235,11 @@ def settings():
     return render_template("settings.html", account_status=message, email_value=email_value)
 
 
-def _wallet_balance(user_id):
-    wallet = db_read("SELECT balance FROM wallets WHERE user_id=%s", (user_id,), single=True)
-    if not wallet:
-        db_write("INSERT INTO wallets (user_id, balance) VALUES (%s, 0.00)", (user_id,))
-        return 0.00
-    return float(wallet["balance"])
-
-
-def _compute_personal_best_balance(user_id, current_balance):
-    tx = db_read(
-        "SELECT amount FROM transactions WHERE user_id=%s ORDER BY created_at ASC",
-        (user_id,),
-    )
-    total_change = sum(float(t["amount"]) for t in tx)
-    starting_balance = current_balance - total_change
-    running = starting_balance
-    best = starting_balance
-    for t in tx:
-        running += float(t["amount"])
-        if running > best:
-            best = running
-    return round(best, 2)
-
-
-def _bonus_xp(user_id):
-    row = db_read(
-        "SELECT COALESCE(SUM(amount), 0) AS total FROM xp_rewards WHERE user_id=%s",
-        (user_id,),
-        single=True,
-    )
-    return int((row or {}).get("total") or 0)
-
-
-def _award_xp_once(user_id, source, amount):
-    if amount <= 0:
-        return False
-    existing = db_read(
-        "SELECT id FROM xp_rewards WHERE user_id=%s AND source=%s LIMIT 1",
-        (user_id, source),
-        single=True,
-    )
-    if existing:
-        return False
-    return db_write(
-        "INSERT INTO xp_rewards (user_id, amount, source) VALUES (%s, %s, %s)",
-        (user_id, amount, source),
-    )
-
-
-def _xp_and_level(total_games, wins, bonus_xp=0):
-    xp = (total_games * 10) + (wins * 50) + bonus_xp
-    level = max(1, xp // 500 + 1)
-    return xp, int(level)
-
-
-def _count_total_games_wins(user_id):
-    bj_total = db_read(
-        "SELECT COUNT(*) AS total FROM blackjack_sessions WHERE user_id=%s AND finished=TRUE",
-        (user_id,),
-        single=True,
-    )
-    bj_wins = db_read(
-        "SELECT COUNT(*) AS total FROM blackjack_sessions WHERE user_id=%s AND finished=TRUE AND result='player_win'",
-        (user_id,),
-        single=True,
-    )
-    ru_total = db_read(
-        "SELECT COUNT(*) AS total FROM roulette_sessions WHERE user_id=%s",
-        (user_id,),
-        single=True,
-    )
-    ru_wins = db_read(
-        "SELECT COUNT(*) AS total FROM roulette_sessions WHERE user_id=%s AND win=TRUE",
-        (user_id,),
-        single=True,
-    )
-    total_games = int((bj_total or {}).get("total") or 0) + int((ru_total or {}).get("total") or 0)
-    wins = int((bj_wins or {}).get("total") or 0) + int((ru_wins or {}).get("total") or 0)
-    return total_games, wins
+def _after_settlement(user_id, win, blackjack=False, black_win=False, color_win=False):
+    """Challenge-Zähler und Achievements nach einer abgerechneten Runde;
+    im selben db_transaction() wie die Abrechnung, nach game_stats.record_*."""
+    challenges.record(user_id, win, blackjack=blackjack, black_win=black_win, color_win=color_win)
+    achievements.evaluate(user_id, win=win, blackjack=blackjack)
 
 
 def _lucky_wheel_segments():
@@ -318,125 +268,38 @@ def _rank_title(level):
     return "Beginner"
 
 
-@app.route("/stats", methods=["GET"])
-@login_required
-def stats():
-    bj_sessions = db_read(
-        "SELECT result, created_at, player_hand FROM blackjack_sessions WHERE user_id=%s AND finished=TRUE ORDER BY created_at ASC",
-        (current_user.id,),
-    )
-    roulette_sessions = db_read(
-        "SELECT win, created_at FROM roulette_sessions WHERE user_id=%s ORDER BY created_at ASC",
-        (current_user.id,),
-    )
+# Gerenderter /stats-Kontext pro User und Aktivitätsversion (siehe activity.py)
+stats_cache = cache.create_store()
 
-    bj_total = len(bj_sessions)
-    bj_wins = sum(1 for s in bj_sessions if s.get("result") == "player_win")
-    bj_losses = sum(1 for s in bj_sessions if s.get("result") in ("dealer_win", "player_bust"))
-    bj_pushes = sum(1 for s in bj_sessions if s.get("result") == "push")
-    bj_win_rate = round((bj_wins / bj_total) * 100, 1) if bj_total else 0
 
-    ru_total = len(roulette_sessions)
-    ru_wins = sum(1 for s in roulette_sessions if s.get("win"))
-    ru_losses = ru_total - ru_wins
+def _stats_context():
+    """Alles, was /stats pro User berechnet (ohne Leaderboards); schreibt nichts."""
+    # Zähler und Siegesserie aus user_game_stats (bei jeder Abrechnung nachgeführt)
+    counts = game_stats.get_stats(current_user.id)
+    max_streak = counts["max_streak"]
+    bj_total = counts["bj_total"]
+    bj_wins = counts["bj_wins"]
+    bj_losses = counts["bj_losses"]
+    bj_pushes = counts["bj_pushes"]
+    bj_win_rate = round((bj_wins / bj_total) * 100, 1) if bj_total else 0
+    ru_total = counts["ru_total"]
+    ru_wins = counts["ru_wins"]
+    ru_losses = counts["ru_losses"]
     ru_win_rate = round((ru_wins / ru_total) * 100, 1) if ru_total else 0
 
-    total_games = bj_total + ru_total
-    wins = bj_wins + ru_wins
-    losses = bj_losses + ru_losses
-    pushes = bj_pushes
+    total_games = counts["total_games"]
+    wins = counts["wins"]
+    losses = counts["losses"]
+    pushes = counts["pushes"]
     win_rate = round((wins / total_games) * 100, 1) if total_games else 0
 
-    # Achievements
-    first_win = wins > 0
-    first_blackjack = False
-    max_streak = 0
-    current_streak = 0
-
-    combined = []
-    for s in bj_sessions:
-        combined.append({
-            "created_at": s.get("created_at"),
-            "win": s.get("result") == "player_win",
-            "result": s.get("result"),
-            "player_hand": s.get("player_hand"),
-        })
-    for s in roulette_sessions:
-        combined.append({
-            "created_at": s.get("created_at"),
-            "win": bool(s.get("win")),
-            "result": "roulette_win" if s.get("win") else "roulette_loss",
-            "player_hand": None,
-        })
-    combined.sort(key=lambda x: x.get("created_at") or datetime.min)
-
-    for s in combined:
-        if s.get("win"):
-            current_streak += 1
-            max_streak = max(max_streak, current_streak)
-        else:
-            current_streak = 0
-
-        if not first_blackjack and s.get("player_hand"):
-            try:
-                hand = json.loads(s.get("player_hand") or "[]")
-                if len(hand) == 2 and hand_value(hand) == 21:
-                    first_blackjack = True
-            except Exception:
-                pass
-
-    achievements = [
-        {
-            "id": "first_win",
-            "title_key": "stats.achievement.firstWin.title",
-            "title": "First Win",
-            "unlocked": first_win,
-            "desc_key": "stats.achievement.firstWin.desc",
-            "desc": "Win your first hand.",
-            "xp": 100,
-        },
-        {
-            "id": "first_blackjack",
-            "title_key": "stats.achievement.firstBlackjack.title",
-            "title": "First Blackjack",
-            "unlocked": first_blackjack,
-            "desc_key": "stats.achievement.firstBlackjack.desc",
-            "desc": "Hit 21 with your first two cards.",
-            "xp": 150,
-        },
-        {
-            "id": "win_streak_3",
-            "title_key": "stats.achievement.winStreak3.title",
-            "title": "3 Win Streak",
-            "unlocked": max_streak >= 3,
-            "desc_key": "stats.achievement.winStreak3.desc",
-            "desc": "Win three hands in a row.",
-            "xp": 150,
-        },
-        {
-            "id": "win_streak_5",
-            "title_key": "stats.achievement.winStreak5.title",
-            "title": "5 Win Streak",
-            "unlocked": max_streak >= 5,
-            "desc_key": "stats.achievement.winStreak5.desc",
-            "desc": "Win five hands in a row.",
-            "xp": 250,
-        },
-        {
-            "id": "games_10",
-            "title_key": "stats.achievement.games10.title",
-            "title": "10 Games Played",
-            "unlocked": total_games >= 10,
-            "desc_key": "stats.achievement.games10.desc",
-            "desc": "Play ten hands.",
-            "xp": 100,
-        },
-    ]
+    # Achievements: Bitmaske aus user_game_stats, gesetzt bei der Abrechnung (achievements.py)
+    achievement_list = achievements.for_display(counts["achievements"])
 
     # Chart data (last 10 sessions)
-    recent = combined[-10:]
     chart_points = []
-    for s in recent:
+    recent, _ = history.page(current_user.id, games=("blackjack", "roulette"), limit=10)
+    for s in reversed(recent):
         result = s.get("result")
         if result in ("player_win", "roulette_win"):
             value = 1
@@ -447,278 +310,33 @@ def stats():
         label = s.get("created_at").strftime("%b %d") if s.get("created_at") else ""
         chart_points.append({"value": value, "label": label, "result": result})
 
-    def _range_sessions(start, end):
-        return [
-            s for s in combined
-            if s.get("created_at") and start <= s.get("created_at") <= end
-        ]
+    # Tages- und Event-Challenges: Zähler werden bei jeder Abrechnung nachgeführt (challenges.py)
+    daily_challenges, events = challenges.progress(current_user.id)
 
-    def _range_max_streak(sessions):
-        streak = 0
-        max_streak_local = 0
-        for s in sessions:
-            if s.get("win"):
-                streak += 1
-                max_streak_local = max(max_streak_local, streak)
-            else:
-                streak = 0
-        return max_streak_local
-
-    def _range_blackjack_hit(sessions):
-        for s in sessions:
-            if not s.get("player_hand"):
-                continue
-            try:
-                hand = json.loads(s.get("player_hand") or "[]")
-                if len(hand) == 2 and hand_value(hand) == 21:
-                    return 1
-            except Exception:
-                continue
-        return 0
-
-    def _event_range(start_month, start_day, end_month, end_day, now_time):
-        year = now_time.year
-        start = datetime(year, start_month, start_day)
-        end_year = year + 1 if end_month < start_month else year
-        end = datetime(end_year, end_month, end_day, 23, 59)
-        if end < now_time:
-            year += 1
-            start = datetime(year, start_month, start_day)
-            end_year = year + 1 if end_month < start_month else year
-            end = datetime(end_year, end_month, end_day, 23, 59)
-        return start, end
-
-    # Daily challenges
-    since = datetime.utcnow() - timedelta(days=1)
-    daily_bj = db_read(
-        "SELECT result FROM blackjack_sessions WHERE user_id=%s AND finished=TRUE AND created_at >= %s",
-        (current_user.id, since),
-    )
-    daily_roulette = db_read(
-        "SELECT win FROM roulette_sessions WHERE user_id=%s AND created_at >= %s",
-        (current_user.id, since),
-    )
-    daily_games = len(daily_bj) + len(daily_roulette)
-    daily_wins = sum(1 for s in daily_bj if s.get("result") == "player_win") + sum(1 for s in daily_roulette if s.get("win"))
-
-    challenges = [
-        {
-            "id": "play5",
-            "title_key": "stats.challenge.play5",
-            "title": "Play 5 rounds",
-            "target": 5,
-            "value": daily_games,
-            "xp": 50,
-        },
-        {
-            "id": "win2",
-            "title_key": "stats.challenge.win2",
-            "title": "Win 2 rounds",
-            "target": 2,
-            "value": daily_wins,
-            "xp": 75,
-        },
-        {
-            "id": "play10",
-            "title_key": "stats.challenge.play10",
-            "title": "Play 10 rounds",
-            "target": 10,
-            "value": daily_games,
-            "xp": 100,
-        },
-    ]
-
-    for achievement in achievements:
-        if achievement.get("unlocked"):
-            _award_xp_once(
-                current_user.id,
-                f"achievement.{achievement['id']}",
-                achievement.get("xp", 0),
-            )
-
-    daily_key = datetime.utcnow().strftime("%Y-%m-%d")
-    for challenge in challenges:
-        if challenge.get("value", 0) >= challenge.get("target", 0):
-            _award_xp_once(
-                current_user.id,
-                f"daily.{challenge['id']}.{daily_key}",
-                challenge.get("xp", 0),
-            )
-
-    bonus_xp = _bonus_xp(current_user.id)
-    xp, level = _xp_and_level(total_games, wins, bonus_xp)
+    progress = xp.get_progress(current_user.id)
+    xp_total, level = progress["xp"], progress["level"]
     rank_title = _rank_title(level)
 
     # Event challenges (time-limited)
-    now = datetime.utcnow()
-    halloween_start, halloween_end = _event_range(10, 28, 10, 31, now)
-    winter_start, winter_end = _event_range(12, 20, 12, 26, now)
-    new_year_start, new_year_end = _event_range(12, 31, 1, 2, now)
-
-    roulette_black_wins = db_read(
-        "SELECT COUNT(*) AS total FROM roulette_sessions "
-        "WHERE user_id=%s AND bet_type='color' AND bet_value='black' "
-        "AND win=TRUE AND created_at BETWEEN %s AND %s",
-        (current_user.id, halloween_start, halloween_end),
-        single=True,
-    )
-    roulette_black_wins = int((roulette_black_wins or {}).get("total") or 0)
-
-    roulette_color_wins = db_read(
-        "SELECT COUNT(*) AS total FROM roulette_sessions "
-        "WHERE user_id=%s AND bet_type='color' AND win=TRUE "
-        "AND created_at BETWEEN %s AND %s",
-        (current_user.id, new_year_start, new_year_end),
-        single=True,
-    )
-    roulette_color_wins = int((roulette_color_wins or {}).get("total") or 0)
-
-    halloween_sessions = _range_sessions(halloween_start, halloween_end)
-    winter_sessions = _range_sessions(winter_start, winter_end)
-    new_year_sessions = _range_sessions(new_year_start, new_year_end)
-
-    halloween_wins = sum(1 for s in halloween_sessions if s.get("win"))
-    winter_wins = sum(1 for s in winter_sessions if s.get("win"))
-
-    event_challenges = []
-    halloween_challenges = [
-        {
-            "desc_key": "stats.event.halloween.challenge1",
-            "desc": "Win 3 rounds in a row. Bonus: +50% XP during the event.",
-            "target": 3,
-            "value": _range_max_streak(halloween_sessions),
-        },
+    event_challenges = [
         {
-            "desc_key": "stats.event.halloween.challenge2",
-            "desc": "Hit Blackjack once. Bonus: +50% XP during the event.",
-            "target": 1,
-            "value": _range_blackjack_hit(halloween_sessions),
-        },
-        {
-            "desc_key": "stats.event.halloween.challenge3",
-            "desc": "Win on black 2 times (Roulette). Bonus: +50% XP during the event.",
-            "target": 2,
-            "value": roulette_black_wins,
-        },
+            "title_key": e["title_key"],
+            "title": e["title"],
+            "theme": e["theme"],
+            "start": e["start"].strftime("%Y-%m-%d %H:%M"),
+            "end": e["end"].strftime("%Y-%m-%d %H:%M"),
+            # Countdown rechnet der Browser ab dem Endzeitpunkt, damit die Seite cachebar bleibt
+            "end_ts": int(e["end"].replace(tzinfo=timezone.utc).timestamp()),
+            "challenges": e["challenges"],
+        }
+        for e in events
     ]
 
-    winter_challenges = [
-        {
-            "desc_key": "stats.event.winter.challenge1",
-            "desc": "Play 10 rounds total. Bonus: Daily login reward.",
-            "target": 10,
-            "value": len(winter_sessions),
-        },
-        {
-            "desc_key": "stats.event.winter.challenge2",
-            "desc": "Win 5 times. Bonus: Daily login reward.",
-            "target": 5,
-            "value": winter_wins,
-        },
-        {
-            "desc_key": "stats.event.winter.challenge3",
-            "desc": "Reach a win streak of 3. Bonus: Daily login reward.",
-            "target": 3,
-            "value": _range_max_streak(winter_sessions),
-        },
-    ]
-
-    new_year_challenges = [
-        {
-            "desc_key": "stats.event.newyear.challenge1",
-            "desc": "Win on red OR black 3 times (Roulette). Bonus: Double XP on all games.",
-            "target": 3,
-            "value": roulette_color_wins,
-        },
-        {
-            "desc_key": "stats.event.newyear.challenge2",
-            "desc": "Win a hand with Double Down (Blackjack). Bonus: Double XP on all games.",
-            "target": 1,
-            "value": 0,
-        },
-        {
-            "desc_key": "stats.event.newyear.challenge3",
-            "desc": "Reach a new personal best balance. Bonus: Double XP on all games.",
-            "target": 1,
-            "value": 0,
-        },
-    ]
-
-    def _append_event(title_key, title, start, end, challenges, theme):
-        remaining = max(0, int((end - now).total_seconds()))
-        event_challenges.append({
-            "title_key": title_key,
-            "title": title,
-            "theme": theme,
-            "start": start.strftime("%Y-%m-%d %H:%M"),
-            "end": end.strftime("%Y-%m-%d %H:%M"),
-            "remaining": remaining,
-            "challenges": challenges,
-        })
-
-    _append_event(
-        "stats.event.halloween.title",
-        "Halloween Event – Night of Luck",
-        halloween_start,
-        halloween_end,
-        halloween_challenges,
-        "halloween",
-    )
-    _append_event(
-        "stats.event.winter.title",
-        "Winter / Christmas Event – Holiday Jackpot",
-        winter_start,
-        winter_end,
-        winter_challenges,
-        "winter",
-    )
-    _append_event(
-        "stats.event.newyear.title",
-        "New Year Event – Double or Nothing",
-        new_year_start,
-        new_year_end,
-        new_year_challenges,
-        "newyear",
-    )
-
     # Personal bests
-    current_balance = _wallet_balance(current_user.id)
-    best_balance = _compute_personal_best_balance(current_user.id, current_balance)
+    current_balance, best_balance = wallet.get_balance_and_best(current_user.id)
     most_wins = wins
 
-    # Leaderboards
-    users = db_read("SELECT id, username FROM users")
-    leaderboard = []
-    for u in users:
-        uid = u["id"]
-        balance = _wallet_balance(uid)
-        bj = db_read(
-            "SELECT result FROM blackjack_sessions WHERE user_id=%s AND finished=TRUE",
-            (uid,),
-        )
-        ru = db_read(
-            "SELECT win FROM roulette_sessions WHERE user_id=%s",
-            (uid,),
-        )
-        total = len(bj) + len(ru)
-        win_count = sum(1 for s in bj if s.get("result") == "player_win") + sum(1 for s in ru if s.get("win"))
-        loss_count = sum(1 for s in bj if s.get("result") in ("dealer_win", "player_bust")) + sum(1 for s in ru if not s.get("win"))
-        bonus_u = _bonus_xp(uid)
-        xp_u, level_u = _xp_and_level(total, win_count, bonus_u)
-        win_rate_u = round((win_count / total) * 100, 1) if total else 0
-        leaderboard.append({
-            "username": u["username"],
-            "balance": balance,
-            "win_rate": win_rate_u,
-            "level": level_u,
-        })
-
-    top_balance = sorted(leaderboard, key=lambda x: x["balance"], reverse=True)[:5]
-    top_win_rate = sorted(leaderboard, key=lambda x: x["win_rate"], reverse=True)[:5]
-    top_level = sorted(leaderboard, key=lambda x: x["level"], reverse=True)[:5]
-
-    return render_template(
-        "stats.html",
+    return dict(
         total_games=total_games,
         wins=wins,
         losses=losses,
@@ -733,22 +351,125 @@ def stats():
         ru_wins=ru_wins,
         ru_losses=ru_losses,
         ru_win_rate=ru_win_rate,
-        achievements=achievements,
+        achievements=achievement_list,
         chart_points=chart_points,
-        xp=xp,
+        xp=xp_total,
         level=level,
         rank_title=rank_title,
-        challenges=challenges,
+        challenges=daily_challenges,
         event_challenges=event_challenges,
         best_balance=best_balance,
         max_streak=max_streak,
         most_wins=most_wins,
-        top_balance=top_balance,
-        top_win_rate=top_win_rate,
-        top_level=top_level,
     )
 
 
+@app.route("/stats", methods=["GET"])
+@login_required
+def stats():
+    # Der Kontext ändert sich nur mit der Aktivitätsversion (Abrechnung, XP, Konto);
+    # das Datum im Key lässt Daily Challenges um Mitternacht neu rechnen,
+    # CACHE_TTL begrenzt das Alter der rollierenden Zeitfenster.
+    # Version vom Primary und Kontext ebenfalls (db_transaction liest nur dort): so wird
+    # nie der Stand einer nachhinkenden Replica unter einer neueren Version gecacht
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    version = activity.get_version(current_user.id)
+    key = f"stats:{current_user.id}:{version}:{today}"
+    entry = stats_cache.get(key)
+    if entry is None:
+        with db_transaction():
+            context = _stats_context()
+        entry = {
+            "context": context,
+            "version": version,
+            "created": int(time.time()),
+        }
+        stats_cache.set(key, entry)
+
+    # Leaderboards (vorberechnet, siehe leaderboard.py) sind für alle gleich und nicht im Cache
+    boards = leaderboard.get_boards()
+    refreshed_at = max((r["refreshed_at"] for rows in boards.values() for r in rows), default=None)
+    etag = "stats-{}-{}-{:x}-{}".format(
+        current_user.id,
+        entry["version"],
+        entry["created"],
+        refreshed_at.strftime("%Y%m%d%H%M%S") if refreshed_at else "0",
+    )
+
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        top_balance = [{"username": r["username"], "balance": float(r["score"])} for r in boards["balance"]]
+        top_win_rate = [{"username": r["username"], "win_rate": float(r["score"])} for r in boards["win_rate"]]
+        top_level = [
+            {"username": r["username"], "level": xp.level_for(r["score"])}
+            for r in boards["level"]
+        ]
+        response = make_response(render_template(
+            "stats.html",
+            top_balance=top_balance,
+            top_win_rate=top_win_rate,
+            top_level=top_level,
+            **entry["context"],
+        ))
+    response.set_etag(etag)
+    # Browser soll jedes Mal nachfragen (If-None-Match), dann reicht meist ein 304
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@app.route("/api/balance-history", methods=["GET"])
+@login_required
+def balance_history():
+    """Saldo-Verlauf fürs Chart (?days=30&resolution=day|hour)"""
+    try:
+        days = min(max(int(request.args.get("days", 30)), 1), 365)
+    except ValueError:
+        days = 30
+    resolution = "hour" if request.args.get("resolution") == "hour" else "day"
+    end = datetime.utcnow()
+    points = wallet.balance_series(current_user.id, end - timedelta(days=days), end, resolution)
+    return jsonify([
+        {
+            "time": p["bucket"].strftime("%Y-%m-%d %H:%M"),
+            "balance": p["balance"],
+            "high": p["high"],
+            "low": p["low"],
+        }
+        for p in points
+    ])
+
+
+@app.route("/api/history", methods=["GET"])
+@login_required
+def game_history():
+    """Spielverlauf, neueste zuerst (?games=blackjack,roulette,wheel&limit=20&cursor=...)"""
+    games = [g for g in request.args.get("games", "").split(",") if g] or None
+    try:
+        rows, next_cursor = history.page(
+            current_user.id,
+            games=games,
+            cursor=request.args.get("cursor") or None,
+            limit=request.args.get("limit") or None,
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid history query."}), 400
+    return jsonify({
+        "items": [
+            {
+                "game": r["game"],
+                "id": r["id"],
+                "time": r["created_at"].strftime("%Y-%m-%d %H:%M:%S"),
+                "result": r["result"],
+                "bet": float(r["bet"] or 0),
+                "payout": float(r["payout"]) if r["payout"] is not None else None,
+            }
+            for r in rows
+        ],
+        "next_cursor": next_cursor,
+    })
+
+
 @app.route("/help", methods=["GET"])
 def help_page():
     return render_template("help.html")
@@ -757,10 +478,8 @@ def help_page():
 @app.route("/lucky-wheel", methods=["GET"])
 @login_required
 def lucky_wheel():
-    balance = _wallet_balance(current_user.id)
-    total_games, wins = _count_total_games_wins(current_user.id)
-    bonus_xp = _bonus_xp(current_user.id)
-    xp, level = _xp_and_level(total_games, wins, bonus_xp)
+    balance = wallet.get_balance(current_user.id)
+    progress = xp.get_progress(current_user.id)
 
     last_free = db_read(
         "SELECT created_at FROM lucky_wheel_spins WHERE user_id=%s AND cost=0 ORDER BY created_at DESC LIMIT 1",
@@ -779,8 +498,8 @@ def lucky_wheel():
     return render_template(
         "lucky_wheel.html",
         balance=balance,
-        xp=xp,
-        level=level,
+        xp=progress["xp"],
+        level=progress["level"],
         segments=_lucky_wheel_segments(),
         free_available=free_available,
         next_free_seconds=next_free_seconds,
@@ -793,52 +512,43 @@ def lucky_wheel():
 def lucky_wheel_spin():
     segments = _lucky_wheel_segments()
     now = datetime.utcnow()
-    balance = _wallet_balance(current_user.id)
-
-    last_free = db_read(
-        "SELECT created_at FROM lucky_wheel_spins WHERE user_id=%s AND cost=0 ORDER BY created_at DESC LIMIT 1",
-        (current_user.id,),
-        single=True,
-    )
-    free_available = True
-    if last_free and last_free.get("created_at"):
-        free_available = (now - last_free["created_at"]) >= timedelta(days=1)
 
-    cost = 0 if free_available else 100
-    if cost > 0 and balance < cost:
+    try:
+        with db_transaction() as tx:
+            # Wallet zuerst sperren, dann XP und Spins (Reihenfolge wie bei allen Abrechnungen)
+            wallet.lock(tx, current_user.id)
+            last_free = tx.read(
+                "SELECT created_at FROM lucky_wheel_spins WHERE user_id=%s AND cost=0 ORDER BY created_at DESC LIMIT 1",
+                (current_user.id,),
+                single=True,
+            )
+            free_available = True
+            if last_free and last_free.get("created_at"):
+                free_available = (now - last_free["created_at"]) >= timedelta(days=1)
+
+            cost = 0 if free_available else 100
+
+            segment_index = random.randint(0, len(segments) - 1)
+            segment = segments[segment_index]
+            reward_type = segment["type"]
+            reward_value = int(segment["value"])
+
+            entries = []
+            if cost > 0:
+                entries.append((-cost, "lucky_wheel_fee", "Lucky Wheel spin fee"))
+            if reward_type == "money" and reward_value > 0:
+                entries.append((reward_value, "lucky_wheel_reward", "Lucky Wheel reward"))
+            elif reward_type == "xp" and reward_value > 0:
+                xp.grant(current_user.id, reward_value, "lucky_wheel")
+            balance = wallet.apply_entries(current_user.id, entries)
+
+            tx.write(
+                "INSERT INTO lucky_wheel_spins (user_id, reward_type, reward_value, cost) VALUES (%s, %s, %s, %s)",
+                (current_user.id, reward_type, reward_value, cost),
+            )
+    except InsufficientFunds:
         return jsonify({"ok": False, "error_key": "wheel.errorBalance"}), 400
 
-    if cost > 0:
-        balance -= cost
-        db_write("UPDATE wallets SET balance=%s WHERE user_id=%s", (balance, current_user.id))
-        db_write(
-            "INSERT INTO transactions (user_id, amount, type, description) VALUES (%s, %s, %s, %s)",
-            (current_user.id, -cost, "lucky_wheel_fee", "Lucky Wheel spin fee"),
-        )
-
-    segment_index = random.randint(0, len(segments) - 1)
-    segment = segments[segment_index]
-    reward_type = segment["type"]
-    reward_value = int(segment["value"])
-
-    if reward_type == "money" and reward_value > 0:
-        balance += reward_value
-        db_write("UPDATE wallets SET balance=%s WHERE user_id=%s", (balance, current_user.id))
-        db_write(
-            "INSERT INTO transactions (user_id, amount, type, description) VALUES (%s, %s, %s, %s)",
-            (current_user.id, reward_value, "lucky_wheel_reward", "Lucky Wheel reward"),
-        )
-    elif reward_type == "xp" and reward_value > 0:
-        db_write(
-            "INSERT INTO xp_rewards (user_id, amount, source) VALUES (%s, %s, %s)",
-            (current_user.id, reward_value, "lucky_wheel"),
-        )
-
-    db_write(
-        "INSERT INTO lucky_wheel_spins (user_id, reward_type, reward_value, cost) VALUES (%s, %s, %s, %s)",
-        (current_user.id, reward_type, reward_value, cost),
-    )
-
     last_free_time = now if cost == 0 else (last_free.get("created_at") if last_free else None)
     if last_free_time:
         remaining = timedelta(days=1) - (now - last_free_time)
@@ -848,9 +558,7 @@ def lucky_wheel_spin():
         next_free_seconds = 0
         free_available = True
 
-    total_games, wins = _count_total_games_wins(current_user.id)
-    bonus_xp = _bonus_xp(current_user.id)
-    xp, level = _xp_and_level(total_games, wins, bonus_xp)
+    progress = xp.get_progress(current_user.id)
 
     return jsonify({
         "ok": True,
@@ -858,8 +566,8 @@ def lucky_wheel_spin():
         "reward_type": reward_type,
         "reward_value": reward_value,
         "balance": balance,
-        "xp": xp,
-        "level": level,
+        "xp": progress["xp"],
+        "level": progress["level"],
         "free_available": free_available,
         "next_free_seconds": next_free_seconds,
     })
@@ -868,40 +576,10 @@ def lucky_wheel_spin():
 @app.route("/roulette", methods=["GET"])
 @login_required
 def roulette():
-    balance = _wallet_balance(current_user.id)
-    best_balance = _compute_personal_best_balance(current_user.id, balance)
-
-    bj_sessions = db_read(
-        "SELECT result, created_at, player_hand FROM blackjack_sessions WHERE user_id=%s AND finished=TRUE",
-        (current_user.id,),
-    )
-    ru_sessions = db_read(
-        "SELECT win, created_at FROM roulette_sessions WHERE user_id=%s",
-        (current_user.id,),
-    )
-    combined = []
-    for s in bj_sessions:
-        combined.append({
-            "created_at": s.get("created_at"),
-            "win": s.get("result") == "player_win",
-        })
-    for s in ru_sessions:
-        combined.append({
-            "created_at": s.get("created_at"),
-            "win": bool(s.get("win")),
-        })
-    combined.sort(key=lambda x: x.get("created_at") or datetime.min)
-
-    max_streak = 0
-    current_streak = 0
-    for s in combined:
-        if s.get("win"):
-            current_streak += 1
-            max_streak = max(max_streak, current_streak)
-        else:
-            current_streak = 0
-
-    most_wins = sum(1 for s in combined if s.get("win"))
+    balance, best_balance = wallet.get_balance_and_best(current_user.id)
+    counts = game_stats.get_stats(current_user.id)
+    max_streak = counts["max_streak"]
+    most_wins = counts["wins"]
 
     show_tutorial = not bool(getattr(current_user, "tutorial_seen_roulette", False))
     return render_template(
@@ -943,6 +621,7 @@ def account_update():
         hashed = generate_password_hash(new_password)
         db_write("UPDATE users SET password=%s WHERE id=%s", (hashed, current_user.id))
 
+    activity.bump(current_user.id)
     return redirect(url_for("settings", status="success"))
 
 
@@ -974,151 +653,137 @@ def roulette_spin():
             amount = 0
         bets = [{"type": bet_type, "value": bet_value, "amount": amount}]
 
+    # Jede Wette als (Maske, Auszahlung, Einsatz) aus roulette_engine.BETS; ungültige fallen weg
     cleaned = []
+    color_bets = set()
     total_bet = 0
     for b in bets:
-        b_type = str(b.get("type", "")).strip().lower()
-        b_value = str(b.get("value", "")).strip().lower()
         try:
             b_amount = float(b.get("amount", 0))
-        except ValueError:
+        except (TypeError, ValueError):
             b_amount = 0
-        if b_amount <= 0:
+        if not wallet.is_valid_amount(b_amount):
+            continue
+        key = roulette_engine.bet_key(b.get("type", ""), b.get("value", ""))
+        if key is None:
             continue
+        mask, multiplier = roulette_engine.BETS[key]
+        total_bet += b_amount
+        cleaned.append((mask, multiplier, b_amount))
+        if key[0] == "color":
+            color_bets.add(key[1])
 
-        valid = False
-        if b_type == "number":
-            valid = b_value.isdigit() and 0 <= int(b_value) <= 36
-        elif b_type == "color":
-            valid = b_value in ("red", "black")
-        elif b_type == "parity":
-            valid = b_value in ("odd", "even")
-        elif b_type == "range":
-            valid = b_value in ("low", "high")
-        elif b_type == "dozen":
-            valid = b_value in ("1st", "2nd", "3rd")
-        elif b_type == "column":
-            valid = b_value in ("1", "2", "3")
-
-        if valid:
-            total_bet += b_amount
-            cleaned.append({"type": b_type, "value": b_value, "amount": b_amount})
-
-    balance = _wallet_balance(current_user.id)
     if total_bet <= 0:
         return jsonify({"error": "Please place a valid bet."}), 400
-    if total_bet > balance:
-        return jsonify({"error": "Insufficient balance."}), 400
-
-    result_number = random.randint(0, 36)
-    red_numbers = {1,3,5,7,9,12,14,16,18,19,21,23,25,27,30,32,34,36}
-    result_color = "green" if result_number == 0 else ("red" if result_number in red_numbers else "black")
-    result_parity = "even" if result_number != 0 and result_number % 2 == 0 else ("odd" if result_number != 0 else "none")
-    result_range = "low" if 1 <= result_number <= 18 else ("high" if 19 <= result_number <= 36 else "none")
-    result_dozen = "1st" if 1 <= result_number <= 12 else ("2nd" if 13 <= result_number <= 24 else ("3rd" if 25 <= result_number <= 36 else "none"))
-    result_column = "1" if result_number in {1,4,7,10,13,16,19,22,25,28,31,34} else (
-        "2" if result_number in {2,5,8,11,14,17,20,23,26,29,32,35} else (
-            "3" if result_number in {3,6,9,12,15,18,21,24,27,30,33,36} else "none"
-        )
-    )
-
-    payout = 0
-    for b in cleaned:
-        win = False
-        multiplier = 0
-        if b["type"] == "number":
-            win = str(result_number) == b["value"]
-            multiplier = 35
-        elif b["type"] == "color":
-            win = result_color == b["value"]
-            multiplier = 1
-        elif b["type"] == "parity":
-            win = result_parity == b["value"]
-            multiplier = 1
-        elif b["type"] == "range":
-            win = result_range == b["value"]
-            multiplier = 1
-        elif b["type"] == "dozen":
-            win = result_dozen == b["value"]
-            multiplier = 2
-        elif b["type"] == "column":
-            win = result_column == b["value"]
-            multiplier = 2
-
-        if win:
-            payout += b["amount"] * (multiplier + 1)
-
-    new_balance = balance - total_bet
-    db_write("UPDATE wallets SET balance=%s WHERE user_id=%s", (new_balance, current_user.id))
-    db_write(
-        "INSERT INTO transactions (user_id, amount, type, description) VALUES (%s, %s, %s, %s)",
-        (current_user.id, -total_bet, "bet", "Roulette bet"),
-    )
-
-    if payout > 0:
-        new_balance += payout
-        db_write("UPDATE wallets SET balance=%s WHERE user_id=%s", (new_balance, current_user.id))
-        db_write(
-            "INSERT INTO transactions (user_id, amount, type, description) VALUES (%s, %s, %s, %s)",
-            (current_user.id, payout, "win", "Roulette win"),
-        )
 
-    db_write(
-        "INSERT INTO roulette_sessions (user_id, bet, bet_type, bet_value, result_number, win, payout) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-        (current_user.id, total_bet, "multi", "mixed", result_number, payout > 0, payout),
-    )
+    result_number = roulette_engine.spin()
+    outcome = roulette_engine.OUTCOMES[result_number]
+    result_color = outcome["color"]
+    payout = roulette_engine.settle(cleaned, result_number)
+
+    try:
+        with db_transaction() as tx:
+            # Einsatz und Gewinn in einem bedingten Wallet-Update (Einsatz muss gedeckt sein);
+            # als erstes Statement sperrt es die Wallet vor Statistik und XP (siehe wallet.lock)
+            new_balance = wallet.apply_entries(current_user.id, [
+                (-total_bet, "bet", "Roulette bet"),
+                (payout, "win", "Roulette win"),
+            ])
+            tx.write(
+                "INSERT INTO roulette_sessions (user_id, bet, bet_type, bet_value, result_number, win, payout) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                (current_user.id, total_bet, "multi", "mixed", result_number, payout > 0, payout),
+            )
+            game_stats.record_roulette(current_user.id, payout > 0)
+            _after_settlement(
+                current_user.id,
+                payout > 0,
+                black_win=result_color == "black" and "black" in color_bets,
+                color_win=result_color in color_bets,
+            )
+    except InsufficientFunds:
+        return jsonify({"error": "Insufficient balance."}), 400
+    except InvalidAmount:
+        # Summe vieler gültiger Einsätze kann noch überlaufen (inf)
+        return jsonify({"error": "Please place a valid bet."}), 400
 
     return jsonify({
         "result_number": result_number,
         "result_color": result_color,
-        "result_parity": result_parity,
-        "result_range": result_range,
-        "result_dozen": result_dozen,
-        "result_column": result_column,
+        "result_parity": outcome["parity"],
+        "result_range": outcome["range"],
+        "result_dozen": outcome["dozen"],
+        "result_column": outcome["column"],
         "payout": payout,
         "balance": new_balance,
     })
 
 
+def _blackjack_state(live):
+    state = live.game.state()
+    state["version"] = live_sessions.version(live)
+    return state
+
+
+def _stale_hand(live):
+    """Client hat einen älteren Stand der Hand gesehen (zweiter Tab, doppelter Klick):
+    dann nicht ziehen, sonst könnte er sich aus zwei Versuchen die Karte aussuchen."""
+    seen = request.form.get("version")
+    return seen is not None and seen != str(live_sessions.version(live))
+
+
+def _finish_blackjack_session(tx, live, payout):
+    """Hand in blackjack_sessions abschliessen, samt abgeleiteter Spalten (Totals,
+    Kartenzahl, Natural, Auszahlung); nur solange sie offen ist. Gibt 1 bzw. 0 zurück."""
+    game = live.game
+    return tx.write(
+        "UPDATE blackjack_sessions SET player_hand=%s, dealer_hand=%s, finished=TRUE, result=%s, "
+        "player_total=%s, dealer_total=%s, card_count=%s, is_natural=%s, payout=%s "
+        "WHERE id=%s AND finished=FALSE",
+        (
+            json.dumps(game.player_hand), json.dumps(game.dealer_hand), game.result,
+            game.player.value, game.dealer.value, len(game.player.cards), game.player.is_blackjack, payout,
+            live.session_id,
+        ),
+    ).rowcount
+
+
 @app.post("/blackjack/new")
 @login_required
 def blackjack_new():
     """Start a new blackjack game"""
-    bet = float(request.form.get("bet", 10))
-    
-    # Check wallet balance
-    wallet = db_read("SELECT balance FROM wallets WHERE user_id=%s", (current_user.id,), single=True)
-    if not wallet or float(wallet["balance"]) < bet:
+    try:
+        bet = float(request.form.get("bet", 10))
+    except ValueError:
+        bet = 0
+    if not wallet.is_valid_amount(bet):
+        return jsonify({"error": "Please place a valid bet."}), 400
+
+    try:
+        with db_transaction() as tx:
+            # Wallet zuerst sperren (Reihenfolge wie bei allen Abrechnungen, siehe wallet.lock)
+            wallet.lock(tx, current_user.id)
+
+            # Create new game (aus dem gesperrten Schuh des Users, gemischt wird nur an der Cut Card;
+            # Karten für Hit und Stand gleich mit reserviert)
+            game, reserved = live_sessions.deal(tx, current_user.id)
+
+            # Save game session
+            session_id = tx.write(
+                "INSERT INTO blackjack_sessions (user_id, bet, player_hand, dealer_hand, finished) VALUES (%s, %s, %s, %s, FALSE)",
+                (current_user.id, bet, json.dumps(game.player_hand), json.dumps(game.dealer_hand))
+            ).lastrowid
+
+            # Deduct bet from wallet (bricht bei zu wenig Guthaben ab -> Rollback)
+            wallet.debit(current_user.id, bet, "bet", f"Blackjack bet - Session {session_id}")
+    except InsufficientFunds:
         return jsonify({"error": "Insufficient balance"}), 400
-    
-    # Create new game
-    game = BlackjackGame()
-    
-    # Save game session
-    db_write(
-        "INSERT INTO blackjack_sessions (user_id, bet, player_hand, dealer_hand, finished) VALUES (%s, %s, %s, %s, FALSE)",
-        (current_user.id, bet, json.dumps(game.player_hand), json.dumps(game.dealer_hand))
-    )
-    
-    # Get the session ID
-    session = db_read(
-        "SELECT id FROM blackjack_sessions WHERE user_id=%s ORDER BY created_at DESC LIMIT 1",
-        (current_user.id,),
-        single=True
-    )
-    
-    # Deduct bet from wallet
-    new_balance = float(wallet["balance"]) - bet
-    db_write("UPDATE wallets SET balance=%s WHERE user_id=%s", (new_balance, current_user.id))
-    
-    # Record transaction
-    db_write(
-        "INSERT INTO transactions (user_id, amount, type, description) VALUES (%s, %s, %s, %s)",
-        (current_user.id, -bet, "bet", f"Blackjack bet - Session {session['id']}")
-    )
-    
-    state = game.state()
-    state['session_id'] = session['id']
+
+    # Hit/Stand arbeiten bis zum Ende der Hand im Speicher (live_sessions.py)
+    live = live_sessions.LiveSession(session_id, current_user.id, bet, game, reserved)
+    live_sessions.put(live)
+
+    state = _blackjack_state(live)
+    state['session_id'] = session_id
     return jsonify(state)
 
 
@@ -1126,99 +791,180 @@ def blackjack_new():
 @login_required
 def blackjack_hit():
     """Player hits (takes another card)"""
-    session_id = request.form.get("session_id")
-    
-    # Get current game session
-    session = db_read(
-        "SELECT * FROM blackjack_sessions WHERE id=%s AND user_id=%s",
-        (session_id, current_user.id),
-        single=True
-    )
-    
-    if not session:
-        return jsonify({"error": "Session not found"}), 404
-    
-    # Recreate game state
-    game = BlackjackGame()
-    game.player_hand = json.loads(session["player_hand"])
-    game.dealer_hand = json.loads(session["dealer_hand"])
-    used_cards = set(game.player_hand + game.dealer_hand)
-    remaining = [card for card in create_deck() if card not in used_cards]
-    random.shuffle(remaining)
-    game.deck = remaining
-    game.finished = session["finished"]
-    game.result = session["result"]
-    
-    # Hit
-    game.hit()
-    
-    # Update session
-    db_write(
-        "UPDATE blackjack_sessions SET player_hand=%s, dealer_hand=%s, finished=%s, result=%s WHERE id=%s",
-        (json.dumps(game.player_hand), json.dumps(game.dealer_hand), game.finished, game.result, session_id)
-    )
-    
-    return jsonify(game.state())
+    with db_transaction() as tx:
+        # Wallet zuerst (ein Bust rechnet ab), dann die Hand sperren und unter der Sperre
+        # neu laden (parallele Hits laufen nacheinander)
+        wallet.lock(tx, current_user.id)
+        live = live_sessions.lock(tx, request.form.get("session_id"), current_user.id)
+        if not live:
+            return jsonify({"error": "Session not found"}), 404
+        if _stale_hand(live):
+            return jsonify({**_blackjack_state(live), "error": "Hand has changed"}), 409
+        game = live.game
+
+        # Hit: Karte aus den beim Austeilen reservierten, der Schuh bleibt unberührt
+        live_sessions.draw(tx, live, game.hit)
+
+        # Bust beendet die Hand (nur solange sie in der DB noch offen ist)
+        if game.finished:
+            live_sessions.release(tx, live)
+            if _finish_blackjack_session(tx, live, 0):
+                game_stats.record_blackjack(current_user.id, game.result)
+                _after_settlement(current_user.id, False)
+        else:
+            # Noch unter der Sperre, sonst lädt die nächste Aktion den Stand ohne diese Karte
+            live_sessions.put(live)
+
+    if game.finished:
+        live_sessions.discard(live.session_id)
+    return jsonify(_blackjack_state(live))
 
 
 @app.post("/blackjack/stand")
 @login_required
 def blackjack_stand():
     """Player stands (dealer plays)"""
-    session_id = request.form.get("session_id")
-    
-    # Get current game session
-    session = db_read(
-        "SELECT * FROM blackjack_sessions WHERE id=%s AND user_id=%s",
-        (session_id, current_user.id),
-        single=True
-    )
-    
-    if not session:
+    with db_transaction() as tx:
+        # Wallet zuerst, erst danach Hand, Schuh, Statistik und XP (siehe wallet.lock)
+        wallet.lock(tx, current_user.id)
+        live = live_sessions.lock(tx, request.form.get("session_id"), current_user.id)
+        if not live:
+            return jsonify({"error": "Session not found"}), 404
+        if _stale_hand(live):
+            return jsonify({**_blackjack_state(live), "error": "Hand has changed"}), 409
+        game = live.game
+
+        # Stand: Dealer zieht aus den reservierten Karten, die übrigen gehen an den Schuh zurück
+        live_sessions.draw(tx, live, game.stand)
+        live_sessions.release(tx, live)
+
+        # Calculate payout
+        payout = live.bet * PAYOUTS[game.result]
+
+        # Update session (nur einmal: ein wiederholtes Stand zahlt nicht doppelt aus)
+        settled = _finish_blackjack_session(tx, live, payout)
+
+        if settled:
+            game_stats.record_blackjack(current_user.id, game.result)
+            _after_settlement(
+                current_user.id,
+                game.result == "player_win",
+                blackjack=game.player.is_blackjack,
+            )
+
+        # Update wallet if player won
+        if settled and payout > 0:
+            wallet.credit(current_user.id, payout, "win", f"Blackjack win - Session {live.session_id}")
+    live_sessions.discard(live.session_id)
+
+    return jsonify(_blackjack_state(live))
+
+
+@app.get("/blackjack/hint")
+@login_required
+def blackjack_hint():
+    """Erwartungswert von Hit und Stand für die offene Hand (?session_id=...)"""
+    live = live_sessions.load(request.args.get("session_id"), current_user.id)
+    if not live:
         return jsonify({"error": "Session not found"}), 404
-    
-    # Recreate game state
-    game = BlackjackGame()
-    game.player_hand = json.loads(session["player_hand"])
-    game.dealer_hand = json.loads(session["dealer_hand"])
-    used_cards = set(game.player_hand + game.dealer_hand)
-    remaining = [card for card in create_deck() if card not in used_cards]
-    random.shuffle(remaining)
-    game.deck = remaining
-    game.finished = session["finished"]
-    game.result = session["result"]
-    
-    # Stand
-    game.stand()
-    
-    # Calculate payout
-    bet = float(session["bet"])
-    payout = 0
-    
-    if game.result == "player_win":
-        payout = bet * 2
-    elif game.result == "push":
-        payout = bet
-    
-    # Update wallet if player won
-    if payout > 0:
-        wallet = db_read("SELECT balance FROM wallets WHERE user_id=%s", (current_user.id,), single=True)
-        new_balance = float(wallet["balance"]) + payout
-        db_write("UPDATE wallets SET balance=%s WHERE user_id=%s", (new_balance, current_user.id))
-        
-        # Record transaction
-        db_write(
-            "INSERT INTO transactions (user_id, amount, type, description) VALUES (%s, %s, %s, %s)",
-            (current_user.id, payout, "win", f"Blackjack win - Session {session_id}")
-        )
-    
-    # Update session
-    db_write(
-        "UPDATE blackjack_sessions SET player_hand=%s, dealer_hand=%s, finished=%s, result=%s WHERE id=%s",
-        (json.dumps(game.player_hand), json.dumps(game.dealer_hand), True, game.result, session_id)
-    )
-    
-    return jsonify(game.state())
+    hint = blackjack_odds.hint(live.game)
+    if hint is None:
+        return jsonify({"error": "Game already finished"}), 400
+    return jsonify(hint)
+
+
+# CLI (flask --app flask_app <command>)
+@app.cli.command("backfill-game-stats")
+def backfill_game_stats_command():
+    """user_game_stats aus allen Blackjack-/Roulette-Sessions neu aufbauen"""
+    count = game_stats.backfill()
+    print(f"Spielstatistik für {count} User aufgebaut")
+
+
+@app.cli.command("backfill-blackjack-outcomes")
+def backfill_blackjack_outcomes_command():
+    """Totals, Kartenzahl, Natural und Auszahlung für alte Blackjack-Hände nachtragen"""
+    count = game_stats.backfill_blackjack_outcomes()
+    print(f"{count} Blackjack-Hände nachgetragen")
+
+
+@app.cli.command("backfill-achievements")
+def backfill_achievements_command():
+    """Achievement-Bits aus Zählern und Historie setzen (nach backfill-game-stats und backfill-blackjack-outcomes)"""
+    count = achievements.backfill()
+    print(f"Achievements für {count} User aufgebaut")
+
+
+@app.cli.command("backfill-xp")
+def backfill_xp_command():
+    """xp_total aus Zählern und xp_rewards neu berechnen (nach backfill-achievements)"""
+    count = xp.backfill()
+    print(f"XP für {count} User neu berechnet")
+
+
+@app.cli.command("refresh-leaderboard")
+def refresh_leaderboard_command():
+    """Ranglisten neu berechnen (z.B. als Scheduled Task)"""
+    leaderboard.refresh()
+    print("Leaderboard aktualisiert")
+
+
+@app.cli.command("backfill-wallets")
+def backfill_wallets_command():
+    """best_balance und balance_history für bestehende Wallets aus dem Ledger aufbauen"""
+    users = db_read("SELECT user_id FROM wallets")
+    for u in users:
+        wallet.backfill(u["user_id"])
+    print(f"{len(users)} Wallets nachgeführt")
+
+
+@app.cli.command("migrate")
+@click.option("--baseline", default=None, help="Migrationen bis zu dieser Version nur als eingespielt markieren")
+def migrate_command(baseline):
+    """Ausstehende Schema-Migrationen aus db/migrations einspielen"""
+    try:
+        versions = migrations.migrate(baseline)
+    except migrations.MigrationError as e:
+        raise click.ClickException(str(e))
+    print(f"{len(versions)} Migration(en) eingespielt: {', '.join(versions) or '-'}")
+
+
+@app.cli.command("check-indexes")
+def check_indexes_command():
+    """EXPLAIN der häufigsten Abfragen; Exit-Code 1, wenn eine davon ganze Tabellen liest"""
+    problems = migrations.check_indexes()
+    for name, issues in problems.items():
+        print(f"{name}: {', '.join(issues)}")
+    if problems:
+        raise SystemExit(1)
+    print(f"{len(migrations.HOT_QUERIES)} Abfragen nutzen Indizes")
+
+
+@app.cli.command("simulate-blackjack")
+@click.option("--hands", default=1_000_000, show_default=True, help="Anzahl Hände")
+@click.option("--strategy", default="basic", show_default=True, help="basic oder standN (z.B. stand17)")
+@click.option("--decks", default=None, type=int, help="Decks im Schuh (Standard: BLACKJACK_DECKS)")
+@click.option("--workers", default=1, show_default=True, help="Prozesse")
+@click.option("--seed", default=None, type=int, help="Seed für reproduzierbare Läufe")
+def simulate_blackjack_command(hands, strategy, decks, workers, seed):
+    """RTP der Blackjack-Regeln per Monte-Carlo-Simulation messen (braucht numpy)"""
+    try:
+        result = simulator.simulate(hands, strategy, decks=decks, workers=workers, seed=seed)
+    except (RuntimeError, ValueError) as e:
+        raise click.ClickException(str(e))
+    print(f"{result['hands']} Hände, Strategie {result['strategy']}, {result['decks']} Deck(s)")
+    print(f"RTP {result['rtp']:.4%} (House Edge {result['house_edge']:.4%}, ±{result['std_error']:.4%})")
+    print(f"Varianz {result['variance']:.4f}")
+    for outcome, share in result["outcomes"].items():
+        print(f"  {outcome}: {share:.4%}")
+
+
+@app.cli.command("build-blackjack-odds")
+@click.option("--workers", default=1, show_default=True, help="Prozesse")
+def build_blackjack_odds_command(workers):
+    """Hint-Tabellen für alle offenen Hände berechnen und nach BLACKJACK_ODDS_PATH schreiben"""
+    count = blackjack_odds.save(workers=workers)
+    print(f"{count} Hände nach {blackjack_odds.BLACKJACK_ODDS_PATH} geschrieben")
 
 
 if __name__ == "__main__":
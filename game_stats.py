@@ -0,0 +1,160 @@
+import logging
+import json
+import activity
+import xp
+from blackjack_engine import PAYOUTS, Hand, encode
+from db import db_read, db_stream, db_transaction, db_write, db_write_many
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
+
+COUNTERS = ["bj_total", "bj_wins", "bj_losses", "bj_pushes", "ru_total", "ru_wins", "ru_losses"]
+# Siegesserie über beide Spiele (Push und Niederlage beenden sie)
+STREAKS = ["current_streak", "max_streak"]
+
+
+def _add(user_id, win, **deltas):
+    # Upsert: erste Runde legt die Zeile an, danach wird nur hochgezählt.
+    # Serie: Sieg -> current_streak + 1, sonst 0 (VALUES(current_streak) ist 1 bzw. 0).
+    # max_streak zuerst: MySQL wertet SET-Zuweisungen von links nach rechts aus,
+    # so sehen beide Backends dort noch die alte Serie
+    # XP der Runde laufen in derselben Zeile mit (xp_total, siehe xp.py)
+    win = int(bool(win))
+    values = [deltas.get(c, 0) for c in COUNTERS]
+    db_write(
+        "INSERT INTO user_game_stats (user_id, " + ", ".join(COUNTERS) + ", max_streak, current_streak, xp_total) "
+        "VALUES (%s, " + ", ".join(["%s"] * len(COUNTERS)) + ", %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE " + ", ".join(f"{c} = {c} + VALUES({c})" for c in COUNTERS) + ", "
+        "max_streak = GREATEST(max_streak, (current_streak + 1) * VALUES(current_streak)), "
+        "current_streak = (current_streak + 1) * VALUES(current_streak), "
+        "xp_total = xp_total + VALUES(xp_total)",
+        (user_id, *values, win, win, xp.game_xp(1, win)),
+    )
+    activity.bump(user_id)
+
+
+def record_blackjack(user_id, result):
+    """Beendete Hand zählen; im selben db_transaction() wie die Abrechnung aufrufen."""
+    _add(
+        user_id,
+        result == "player_win",
+        bj_total=1,
+        bj_wins=int(result == "player_win"),
+        bj_losses=int(result in ("dealer_win", "player_bust")),
+        bj_pushes=int(result == "push"),
+    )
+
+
+def record_roulette(user_id, win):
+    """Roulette-Spin zählen; im selben db_transaction() wie die Abrechnung aufrufen."""
+    _add(user_id, win, ru_total=1, ru_wins=int(bool(win)), ru_losses=int(not win))
+
+
+def get_stats(user_id):
+    """Alle Zähler und Siegesserien des Users (Primary-Key-Lookup), plus Summen über beide Spiele."""
+    row = db_read(
+        "SELECT " + ", ".join(COUNTERS + STREAKS) + ", achievements FROM user_game_stats WHERE user_id=%s",
+        (user_id,),
+        single=True,
+    ) or {}
+    stats = {c: int(row.get(c) or 0) for c in COUNTERS + STREAKS}
+    stats["total_games"] = stats["bj_total"] + stats["ru_total"]
+    stats["wins"] = stats["bj_wins"] + stats["ru_wins"]
+    stats["losses"] = stats["bj_losses"] + stats["ru_losses"]
+    stats["pushes"] = stats["bj_pushes"]
+    stats["achievements"] = int(row.get("achievements") or 0)  # Bitmaske, siehe achievements.py
+    return stats
+
+
+def has_natural(user_id, start=None, end=None):
+    """Hatte der User je (bzw. im Zeitraum [start, end]) einen Blackjack mit zwei Karten?
+    EXISTS über idx_bj_user_natural_created."""
+    sql = "SELECT EXISTS(SELECT 1 FROM blackjack_sessions WHERE user_id=%s AND is_natural=TRUE"
+    params = [user_id]
+    if start is not None:
+        sql += " AND created_at BETWEEN %s AND %s"
+        params += [start, end]
+    row = db_read(sql + ") AS found", params, single=True)
+    return bool(row and row["found"])
+
+
+def backfill_blackjack_outcomes(chunk_size=500):
+    """Einmalig: abgeleitete Spalten (Totals, Kartenzahl, Natural, Auszahlung) für
+    beendete Hände nachtragen, die vor Migration 0014 abgerechnet wurden."""
+    updates = []
+    for row_id, bet, result, player_hand, dealer_hand in db_stream(
+        "SELECT id, bet, result, player_hand, dealer_hand FROM blackjack_sessions "
+        "WHERE finished=TRUE AND player_total IS NULL",
+        as_dict=False,
+    ):
+        try:
+            player = Hand(encode(c) for c in json.loads(player_hand or "[]"))
+            dealer = Hand(encode(c) for c in json.loads(dealer_hand or "[]"))
+        except (ValueError, KeyError):
+            logger.warning("blackjack_sessions %s: Hände nicht lesbar, übersprungen", row_id)
+            continue
+        payout = float(bet) * PAYOUTS.get(result, 0)
+        updates.append((player.value, dealer.value, len(player.cards), player.is_blackjack, payout, row_id))
+
+    for i in range(0, len(updates), chunk_size):
+        with db_transaction() as tx:
+            for values in updates[i:i + chunk_size]:
+                tx.write(
+                    "UPDATE blackjack_sessions SET player_total=%s, dealer_total=%s, card_count=%s, "
+                    "is_natural=%s, payout=%s WHERE id=%s",
+                    values,
+                )
+    logger.info("Abgeleitete Spalten für %s Blackjack-Hände nachgetragen", len(updates))
+    return len(updates)
+
+
+def backfill():
+    """Einmalig: Zähler und Serien aller User aus blackjack_sessions/roulette_sessions neu aufbauen."""
+    with db_transaction() as tx:
+        rows = {}
+        for r in tx.read(
+            "SELECT user_id, result, COUNT(*) AS total FROM blackjack_sessions "
+            "WHERE finished=TRUE GROUP BY user_id, result"
+        ):
+            counters = rows.setdefault(r["user_id"], dict.fromkeys(COUNTERS + STREAKS, 0))
+            total = int(r["total"])
+            counters["bj_total"] += total
+            if r["result"] == "player_win":
+                counters["bj_wins"] += total
+            elif r["result"] in ("dealer_win", "player_bust"):
+                counters["bj_losses"] += total
+            elif r["result"] == "push":
+                counters["bj_pushes"] += total
+
+        for r in tx.read(
+            "SELECT user_id, win, COUNT(*) AS total FROM roulette_sessions GROUP BY user_id, win"
+        ):
+            counters = rows.setdefault(r["user_id"], dict.fromkeys(COUNTERS + STREAKS, 0))
+            total = int(r["total"])
+            counters["ru_total"] += total
+            counters["ru_wins" if r["win"] else "ru_losses"] += total
+
+        # Serien: Verlauf pro User chronologisch abgehen (gleiche Reihenfolge wie /stats);
+        # laufend nachgeführt zählt die Reihenfolge der Abrechnung, bei Sessions in
+        # derselben Sekunde kann der Backfill davon abweichen
+        for user_id, _created_at, _game, _id, win in db_stream(
+            "SELECT user_id, created_at, 'blackjack' AS game, id, result = 'player_win' AS win "
+            "FROM blackjack_sessions WHERE finished=TRUE "
+            "UNION ALL "
+            "SELECT user_id, created_at, 'roulette' AS game, id, win FROM roulette_sessions "
+            "ORDER BY user_id ASC, created_at ASC, game ASC, id ASC",
+            as_dict=False,
+        ):
+            counters = rows[user_id]
+            counters["current_streak"] = counters["current_streak"] + 1 if win else 0
+            counters["max_streak"] = max(counters["max_streak"], counters["current_streak"])
+
+        # Upsert statt DELETE: die Achievement-Bits bleiben erhalten
+        db_write_many(
+            "INSERT INTO user_game_stats (user_id, " + ", ".join(COUNTERS + STREAKS) + ") "
+            "VALUES (%s, " + ", ".join(["%s"] * len(COUNTERS + STREAKS)) + ")",
+            [(user_id, *(c[k] for k in COUNTERS + STREAKS)) for user_id, c in rows.items()],
+            on_duplicate=", ".join(f"{k} = VALUES({k})" for k in COUNTERS + STREAKS),
+        )
+    logger.info("user_game_stats für %s User neu aufgebaut", len(rows))
+    return len(rows)
@@ -0,0 +1,97 @@
+import logging
+import os
+from datetime import datetime
+from db import db_read
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
+
+# Einstellungen (.env)
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "100"))
+
+# Pro Spiel eine Query mit einheitlichen Spalten (game, id, created_at, result, bet, payout).
+# Reihenfolge des Verlaufs: created_at, dann game, dann id (alles absteigend);
+# die Spielnamen sortieren alphabetisch, darauf baut _after() auf.
+_SOURCES = {
+    "blackjack": (
+        "SELECT 'blackjack' AS game, id, created_at, result, bet, payout "
+        "FROM blackjack_sessions WHERE user_id=%s AND finished=TRUE"
+    ),
+    "roulette": (
+        "SELECT 'roulette' AS game, id, created_at, "
+        "CASE WHEN win THEN 'roulette_win' ELSE 'roulette_loss' END AS result, bet, payout "
+        "FROM roulette_sessions WHERE user_id=%s"
+    ),
+    "wheel": (
+        "SELECT 'wheel' AS game, id, created_at, reward_type AS result, cost AS bet, reward_value AS payout "
+        "FROM lucky_wheel_spins WHERE user_id=%s"
+    ),
+}
+GAMES = tuple(sorted(_SOURCES))
+
+_CURSOR_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def encode_cursor(row):
+    return "{}_{}_{}".format(row["created_at"].strftime(_CURSOR_FORMAT), row["game"], row["id"])
+
+
+def decode_cursor(cursor):
+    """(created_at, game, id) aus dem Cursor; ValueError bei ungültigem Wert."""
+    created_at, game, row_id = cursor.split("_")
+    if game not in _SOURCES:
+        raise ValueError(f"Unbekanntes Spiel im Cursor: {game}")
+    return datetime.strptime(created_at, _CURSOR_FORMAT), game, int(row_id)
+
+
+def _after(game, cursor):
+    # Keyset-Bedingung "kommt nach dem Cursor" für eine Quelle: game ist pro Quelle
+    # konstant, so bleibt nur ein Range auf (created_at, id) übrig
+    created_at, cursor_game, cursor_id = cursor
+    if game < cursor_game:
+        return " AND created_at <= %s", (created_at,)
+    if game > cursor_game:
+        return " AND created_at < %s", (created_at,)
+    return " AND (created_at < %s OR (created_at = %s AND id < %s))", (created_at, created_at, cursor_id)
+
+
+def build_query(user_id, games=GAMES, cursor=None, limit=HISTORY_PAGE_SIZE):
+    """(sql, params) für eine Seite: UNION ALL der gewählten Spiele, jedes schon
+    über seinen Index sortiert und auf limit begrenzt, danach gemeinsam sortiert."""
+    parts = []
+    params = []
+    for game in games:
+        sql = _SOURCES[game]
+        part_params = [user_id]
+        if cursor is not None:
+            condition, values = _after(game, cursor)
+            sql += condition
+            part_params.extend(values)
+        parts.append(f"SELECT * FROM ({sql} ORDER BY created_at DESC, id DESC LIMIT %s) AS {game}_rows")
+        params.extend(part_params + [limit])
+    return (
+        " UNION ALL ".join(parts) + " ORDER BY created_at DESC, game DESC, id DESC LIMIT %s",
+        (*params, limit),
+    )
+
+
+def page(user_id, games=None, cursor=None, limit=None):
+    """Eine Seite des Spielverlaufs, neueste zuerst.
+
+    games: Teilmenge von GAMES (Standard: alle); cursor: next_cursor der vorigen Seite.
+    Gibt (rows, next_cursor) zurück, next_cursor ist None auf der letzten Seite.
+    """
+    games = sorted(set(games or GAMES))
+    for game in games:
+        if game not in _SOURCES:
+            raise ValueError(f"Unbekanntes Spiel: {game}")
+    limit = min(max(int(limit or HISTORY_PAGE_SIZE), 1), HISTORY_MAX_PAGE_SIZE)
+    if isinstance(cursor, str):
+        cursor = decode_cursor(cursor)
+
+    # Eine Zeile mehr lesen: so ist ohne COUNT klar, ob es weitergeht
+    sql, params = build_query(user_id, games, cursor, limit + 1)
+    rows = db_read(sql, params)
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,106 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from db import db_read, db_transaction, db_write_many
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
+
+# Einstellungen (.env)
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "5"))
+LEADERBOARD_MAX_AGE = int(os.getenv("LEADERBOARD_MAX_AGE", "60"))  # Sekunden
+LEADERBOARD_BACKGROUND = os.getenv("LEADERBOARD_BACKGROUND", "1") == "1"
+
+# Jede Rangliste: Name -> Query, die (user_id, username, score) absteigend liefert
+BOARDS = {
+    "balance": (
+        "SELECT u.id AS user_id, u.username, COALESCE(w.balance, 0) AS score "
+        "FROM users u LEFT JOIN wallets w ON w.user_id = u.id "
+        "ORDER BY score DESC, u.id ASC LIMIT %s"
+    ),
+    "win_rate": (
+        "SELECT u.id AS user_id, u.username, "
+        "CASE WHEN s.bj_total + s.ru_total > 0 "
+        "THEN ROUND((s.bj_wins + s.ru_wins) * 100.0 / (s.bj_total + s.ru_total), 1) "
+        "ELSE 0 END AS score "
+        "FROM users u LEFT JOIN user_game_stats s ON s.user_id = u.id "
+        "ORDER BY score DESC, u.id ASC LIMIT %s"
+    ),
+    "level": (
+        "SELECT u.id AS user_id, u.username, COALESCE(s.xp_total, 0) AS score "
+        "FROM users u LEFT JOIN user_game_stats s ON s.user_id = u.id "
+        "ORDER BY score DESC, u.id ASC LIMIT %s"
+    ),
+}
+
+_refresh_lock = threading.Lock()
+
+
+def refresh(size=None):
+    """Alle Ranglisten neu berechnen (je eine Query) und in leaderboard_entries ersetzen."""
+    if not _refresh_lock.acquire(blocking=False):
+        return False  # läuft schon
+    try:
+        size = size or LEADERBOARD_SIZE
+        now = datetime.utcnow()
+        rows = []
+        for board, sql in BOARDS.items():
+            for position, r in enumerate(db_read(sql, (size,), primary=True), start=1):
+                rows.append((board, position, r["user_id"], r["username"], r["score"] or 0, now))
+        with db_transaction() as tx:
+            tx.write("DELETE FROM leaderboard_entries")
+            db_write_many(
+                "INSERT INTO leaderboard_entries (board, position, user_id, username, score, refreshed_at) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                rows,
+            )
+        logger.debug("Leaderboard aktualisiert (%s Einträge)", len(rows))
+        return True
+    finally:
+        _refresh_lock.release()
+
+
+def _refresh_async():
+    def run():
+        try:
+            refresh()
+        except Exception:
+            logger.exception("Leaderboard-Refresh fehlgeschlagen")
+    threading.Thread(target=run, name="leaderboard-refresh", daemon=True).start()
+
+
+def read_query():
+    """(sql, params) für alle Ranglisten, als Range über den Primary Key (board, position)."""
+    return (
+        "SELECT board, position, user_id, username, score, refreshed_at FROM leaderboard_entries "
+        "WHERE board IN (" + ", ".join(["%s"] * len(BOARDS)) + ") ORDER BY board, position",
+        tuple(BOARDS),
+    )
+
+
+def _read_entries():
+    return db_read(*read_query())
+
+
+def get_boards(max_age=None):
+    """Top-K aller Ranglisten mit einer Query: {"balance": [...], "win_rate": [...], "level": [...]}.
+
+    Ist der Stand älter als max_age Sekunden (LEADERBOARD_MAX_AGE), wird im
+    Hintergrund neu berechnet; ohne Daten (oder LEADERBOARD_BACKGROUND=0) sofort.
+    """
+    max_age = LEADERBOARD_MAX_AGE if max_age is None else max_age
+    rows = _read_entries()
+    refreshed_at = min((r["refreshed_at"] for r in rows), default=None)
+    stale = refreshed_at is None or datetime.utcnow() - refreshed_at > timedelta(seconds=max_age)
+    if stale:
+        if rows and LEADERBOARD_BACKGROUND:
+            _refresh_async()
+        elif refresh():
+            rows = _read_entries()
+
+    boards = {board: [] for board in BOARDS}
+    for r in rows:
+        if r["board"] in boards:
+            boards[r["board"]].append(r)
+    return boards
@@ -0,0 +1,224 @@
+import atexit
+import json
+import logging
+import os
+import cache
+from blackjack_engine import SHOE_DECKS, BlackjackGame, Shoe
+from db import db_read, db_write
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
+
+# Einstellungen (.env)
+# sqlite: geteilt von allen Workern auf einem Server (CACHE_SQLITE_PATH); memory: nur bei
+# genau einem Worker, sonst sieht ein Stand auf einem anderen Worker die Hand ohne den Hit;
+# none: jede Aktion direkt in blackjack_sessions (wie früher)
+LIVE_SESSIONS_BACKEND = os.getenv("LIVE_SESSIONS_BACKEND", "sqlite")
+LIVE_SESSIONS_MAX = int(os.getenv("LIVE_SESSIONS_MAX", "5000"))
+LIVE_SESSIONS_TTL = int(os.getenv("LIVE_SESSIONS_TTL", "1800"))  # Sekunden ohne Aktion
+# Karten, die beim Austeilen für Hit und Stand aus dem Schuh reserviert werden
+BLACKJACK_RESERVED_CARDS = int(os.getenv("BLACKJACK_RESERVED_CARDS", "10"))
+
+
+class LiveSession:
+    """Offene Blackjack-Hand: Spielstand plus was Hit/Stand sonst aus der DB lesen müssten.
+
+    reserved: (Position im Schuh, Karten) des Blocks aus deal(); game.shoe zieht daraus.
+    """
+
+    __slots__ = ("session_id", "user_id", "bet", "game", "reserved")
+
+    def __init__(self, session_id, user_id, bet, game, reserved=None):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.bet = bet
+        self.game = game
+        self.reserved = reserved
+
+
+def lock_shoe(tx, user_id):
+    """Schuh des Users im laufenden db_transaction() tx vom Primary laden und sperren
+    (SELECT ... FOR UPDATE); neu gemischt, wenn keiner da ist oder BLACKJACK_DECKS
+    sich geändert hat.
+
+    Der Schuh in blackjack_shoes ist der einzige Stand: wer daraus Karten nimmt, sperrt
+    ihn und schreibt ihn mit save_shoe() in derselben Transaktion zurück. So bekommen
+    parallele Hände nie dieselben Karten und eine neue Hand nie die einer abgebrochenen.
+    """
+    row = tx.read(
+        "SELECT decks, cards, position, cut FROM blackjack_shoes WHERE user_id=%s FOR UPDATE",
+        (user_id,),
+        single=True,
+    )
+    if not row or row["decks"] != SHOE_DECKS:
+        return Shoe(SHOE_DECKS)
+    return Shoe(row["decks"], cards=row["cards"], position=row["position"], cut=row["cut"])
+
+
+def save_shoe(user_id, shoe):
+    """Schuh sichern; im selben db_transaction() wie lock_shoe() und die gezogenen Karten."""
+    db_write(
+        "INSERT INTO blackjack_shoes (user_id, decks, cards, position, cut) VALUES (%s, %s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE decks = VALUES(decks), cards = VALUES(cards), "
+        "position = VALUES(position), cut = VALUES(cut)",
+        (user_id, shoe.decks, bytes(shoe.cards), shoe.position, shoe.cut),
+    )
+
+
+def deal(tx, user_id):
+    """Neue Hand aus dem gesperrten Schuh geben und die nächsten BLACKJACK_RESERVED_CARDS
+    Karten für Hit und Stand reservieren; der Schuh wird nur hier und in release() geschrieben.
+
+    Gibt (game, reserved) für LiveSession zurück. Reicht der Block nicht (sehr lange
+    Hand), mischt game.shoe wie ein leerer Schuh neu, ohne die Karten auf dem Tisch.
+    """
+    shoe = lock_shoe(tx, user_id)
+    game = BlackjackGame(shoe)
+    if store.name == "none":
+        # Die Hand lebt nur in blackjack_sessions, ein Block ginge jedes Mal verloren
+        save_shoe(user_id, shoe)
+        game.shoe = None
+        return game, None
+    start = shoe.position
+    block = bytes(shoe.cards[start:start + BLACKJACK_RESERVED_CARDS])
+    shoe.position += len(block)
+    save_shoe(user_id, shoe)
+    game.shoe = Shoe(shoe.decks, cards=block, cut=len(block))
+    return game, (start, block)
+
+
+def draw(tx, live, action):
+    """action (game.hit oder game.stand) ausführen. Gezogen wird aus dem reservierten Block;
+    ohne Block (Hand aus blackjack_sessions geladen) direkt aus dem gesperrten Schuh."""
+    game = live.game
+    if game.shoe is not None:
+        action()
+        return
+    game.shoe = lock_shoe(tx, live.user_id)
+    action()
+    save_shoe(live.user_id, game.shoe)
+    # Kein Block: die nächste Aktion sperrt den Schuh wieder, statt aus dieser Kopie zu ziehen
+    game.shoe = None
+
+
+def release(tx, live):
+    """Beim Abrechnen: nicht gezogene Karten des Blocks an den Schuh zurückgeben, solange
+    seit dem Austeilen keine andere Hand daraus gezogen hat; sonst bleiben sie verbrannt."""
+    if live.reserved is None or live.game.shoe is None:
+        return
+    start, block = live.reserved
+    reserve = live.game.shoe
+    if reserve.cards != block or reserve.position >= len(block):
+        return  # Block aufgebraucht bzw. neu gemischt
+    end = start + len(block)
+    shoe = lock_shoe(tx, live.user_id)
+    if shoe.position == end and shoe.cards[start:end] == block:
+        shoe.position = start + reserve.position
+        save_shoe(live.user_id, shoe)
+
+
+def _persist(_key, live):
+    # Verdrängt oder abgelaufen: Zwischenstand der offenen Hand sichern. Der reservierte
+    # Block nicht, seine übrigen Karten bleiben verbrannt; aus der DB geladen zieht die
+    # Hand direkt aus dem Schuh (draw)
+    db_write(
+        "UPDATE blackjack_sessions SET player_hand=%s, dealer_hand=%s WHERE id=%s AND finished=FALSE",
+        (json.dumps(live.game.player_hand), json.dumps(live.game.dealer_hand), live.session_id),
+    )
+
+
+store = cache.create_store(
+    LIVE_SESSIONS_BACKEND,
+    max_entries=LIVE_SESSIONS_MAX,
+    ttl=LIVE_SESSIONS_TTL,
+    on_evict=_persist,
+    namespace="live_sessions",
+)
+# Beim Beenden offene Hände aus dem Prozess-Speicher sichern (die SQLite-Datei überlebt
+# den Worker, dort würde drain() die Hände aller anderen Worker mit verdrängen)
+if store.name == "memory":
+    atexit.register(store.drain)
+
+
+def _key(session_id):
+    return f"bj:{session_id}"
+
+
+def put(live):
+    """Hand nach einer Aktion ablegen, die sie nicht beendet hat."""
+    if store.name == "none":
+        _persist(None, live)
+    else:
+        store.set(_key(live.session_id), live)
+
+
+def _session_id(session_id):
+    try:
+        return int(session_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def _from_row(session_id, user_id, row):
+    # Ohne Schuh: Hit/Stand ziehen dann direkt aus dem gesperrten Schuh (draw)
+    game = BlackjackGame.restore(
+        json.loads(row["player_hand"]),
+        json.loads(row["dealer_hand"]),
+        row["finished"],
+        row["result"],
+    )
+    return LiveSession(session_id, user_id, float(row["bet"]), game)
+
+
+def load(session_id, user_id):
+    """Offene oder beendete Hand des Users: aus dem Store, sonst aus blackjack_sessions.
+    Nur zum Lesen (Hint); Hit und Stand nehmen lock()."""
+    session_id = _session_id(session_id)
+    if session_id is None:
+        return None
+    live = store.get(_key(session_id))
+    if live is not None:
+        return live if live.user_id == user_id else None
+
+    row = db_read(
+        "SELECT bet, player_hand, dealer_hand, finished, result FROM blackjack_sessions WHERE id=%s AND user_id=%s",
+        (session_id, user_id),
+        single=True,
+    )
+    return _from_row(session_id, user_id, row) if row else None
+
+
+def lock(tx, session_id, user_id):
+    """Hand des Users im laufenden db_transaction() tx sperren (SELECT ... FOR UPDATE auf
+    blackjack_sessions) und unter der Sperre neu laden.
+
+    Hit und Stand derselben Hand (zwei Tabs, Doppelklick) laufen so nacheinander und jede
+    Aktion sieht die vorige; put() muss deshalb noch vor dem Commit laufen. Beendete Hände
+    kommen immer aus der DB, auch wenn der Store noch den Stand vor dem Abrechnen hat.
+    """
+    session_id = _session_id(session_id)
+    if session_id is None:
+        return None
+    row = tx.read(
+        "SELECT bet, player_hand, dealer_hand, finished, result FROM blackjack_sessions "
+        "WHERE id=%s AND user_id=%s FOR UPDATE",
+        (session_id, user_id),
+        single=True,
+    )
+    if not row:
+        return None
+    if not row["finished"]:
+        live = store.get(_key(session_id))
+        if live is not None and live.user_id == user_id:
+            return live
+    return _from_row(session_id, user_id, row)
+
+
+def version(live):
+    """Stand der Hand, wie ihn der Client kennt: Anzahl Karten des Spielers (jeder Hit zieht eine)."""
+    return len(live.game.player.cards)
+
+
+def discard(session_id):
+    """Nach dem Abrechnen (die DB-Zeile ist dann final)."""
+    store.delete(_key(session_id))
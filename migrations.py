@@ -0,0 +1,164 @@
+import logging
+import os
+import re
+from datetime import datetime
+import history
+import leaderboard
+from db import backend, db_read, db_transaction
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db", "migrations")
+
+# Dateiname: <vierstellige Version>_<name>.sql, z.B. 0006_hot_query_indexes.sql
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+class MigrationError(Exception):
+    """Migration kann nicht (sicher) ausgeführt werden."""
+
+
+def available():
+    """Alle Migrationsdateien als [(version, name, path)], aufsteigend nach Version."""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        m = _FILENAME.match(filename)
+        if m:
+            migrations.append((m.group(1), m.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return migrations
+
+
+def _statements(script):
+    # Kommentarzeilen entfernen, dann an ';' trennen (die Skripte enthalten keine ';' in Strings)
+    lines = [line for line in script.splitlines() if not line.strip().startswith("--")]
+    return [s.strip() for s in "\n".join(lines).split(";") if s.strip()]
+
+
+def applied():
+    """Versionen, die laut schema_migrations schon eingespielt sind."""
+    with db_transaction() as tx:
+        tx.write(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version VARCHAR(20) PRIMARY KEY, "
+            "name VARCHAR(255) NOT NULL, "
+            "applied_at DATETIME DEFAULT CURRENT_TIMESTAMP)"
+        )
+        return {r["version"] for r in tx.read("SELECT version FROM schema_migrations")}
+
+
+def _schema_exists():
+    try:
+        db_read("SELECT 1 FROM users LIMIT 1", primary=True)
+        return True
+    except Exception:
+        return False
+
+
+def pending():
+    done = applied()
+    return [m for m in available() if m[0] not in done]
+
+
+def migrate(baseline=None):
+    """Spielt alle ausstehenden Migrationen der Reihe nach ein und gibt ihre Versionen zurück.
+
+    Jede Migration läuft in einer Transaktion und wird in schema_migrations
+    eingetragen. Achtung: MySQL committet DDL sofort, bricht eine Migration
+    mittendrin ab, muss der Teil davor von Hand bereinigt werden.
+
+    baseline: Datenbanken, die noch mit einer älteren TODOS.sql angelegt wurden,
+    haben keine schema_migrations. Mit baseline="0003" werden 0001-0003 nur als
+    eingespielt markiert (ohne sie auszuführen) und der Rest normal eingespielt.
+    """
+    todo = pending()
+    with db_transaction() as tx:
+        if baseline:
+            for version, name, _ in [m for m in todo if m[0] <= baseline]:
+                tx.write(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name)
+                )
+            todo = [m for m in todo if m[0] > baseline]
+        elif len(todo) == len(available()) and _schema_exists():
+            raise MigrationError(
+                "Tabellen existieren, aber schema_migrations ist leer: "
+                "mit --baseline <version> den vorhandenen Stand markieren"
+            )
+
+    for version, name, path in todo:
+        with open(path, encoding="utf-8") as f:
+            statements = _statements(f.read())
+        with db_transaction() as tx:
+            for sql in statements:
+                tx.write(backend.translate_ddl(sql))
+            tx.write("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+        logger.info("Migration %s_%s eingespielt", version, name)
+    return [m[0] for m in todo]
+
+
+# Die häufigsten Abfragen der App mit Beispielparametern; check_indexes() prüft ihre Pläne
+_NOW = datetime(2026, 1, 1)
+
+HOT_QUERIES = {
+    "history": history.build_query(1, history.GAMES, None, 21),
+    "history_next_page": history.build_query(1, history.GAMES, (_NOW, "roulette", 1), 21),
+    "blackjack_natural": (
+        "SELECT EXISTS(SELECT 1 FROM blackjack_sessions WHERE user_id=%s AND is_natural=TRUE "
+        "AND created_at BETWEEN %s AND %s) AS found",
+        (1, _NOW, _NOW),
+    ),
+    "last_free_spin": (
+        "SELECT created_at FROM lucky_wheel_spins WHERE user_id=%s AND cost=0 ORDER BY created_at DESC LIMIT 1",
+        (1,),
+    ),
+    "ledger": (
+        "SELECT amount, created_at FROM transactions WHERE user_id=%s ORDER BY created_at ASC, id ASC",
+        (1,),
+    ),
+    "balance_history": (
+        "SELECT bucket, balance, high, low FROM balance_history "
+        "WHERE user_id=%s AND bucket BETWEEN %s AND %s ORDER BY bucket ASC",
+        (1, _NOW, _NOW),
+    ),
+    "challenge_progress": (
+        "SELECT * FROM challenge_progress WHERE user_id=%s AND "
+        "((scope=%s AND period=%s) OR (scope=%s AND period=%s))",
+        (1, "daily", "2026-01-01", "halloween", "2026-10-28"),
+    ),
+    "challenge_daily": (
+        "SELECT * FROM challenge_progress WHERE user_id=%s AND scope='daily' AND period=%s",
+        (1, "2026-01-01"),
+    ),
+    "user_game_stats": (
+        "SELECT * FROM user_game_stats WHERE user_id=%s",
+        (1,),
+    ),
+    "blackjack_session": (
+        "SELECT * FROM blackjack_sessions WHERE id=%s AND user_id=%s",
+        (1, 1),
+    ),
+    "blackjack_shoe": (
+        "SELECT decks, cards, position, cut FROM blackjack_shoes WHERE user_id=%s FOR UPDATE",
+        (1,),
+    ),
+    "leaderboard": leaderboard.read_query(),
+}
+
+
+def check_indexes():
+    """EXPLAIN für alle HOT_QUERIES: {name: [Probleme]}, leer = alles läuft über Indizes.
+
+    Probleme sind Tabellen mit Full Scan oder der Fehler, falls die Abfrage
+    gar nicht läuft (z.B. weil eine Migration fehlt).
+    """
+    problems = {}
+    for name, (sql, params) in HOT_QUERIES.items():
+        try:
+            plan = db_read(backend.explain_prefix + sql, params, primary=True)
+        except Exception as e:
+            problems[name] = [f"Fehler: {e}"]
+            continue
+        scans = backend.full_scans(plan)
+        if scans:
+            problems[name] = [f"Full Scan {t}" for t in scans]
+    return problems
@@ -0,0 +1,98 @@
+import random
+
+# Europäisches Roulette: 0-36. Jede Wette ist eine 37-Bit-Maske der Gewinnzahlen plus
+# Auszahlung (x zu 1); abrechnen = ein Bit-Test pro Wette.
+RED_NUMBERS = frozenset({1, 3, 5, 7, 9, 12, 14, 16, 18, 19, 21, 23, 25, 27, 30, 32, 34, 36})
+NUMBERS = range(37)
+
+
+def _outcome(n):
+    if n == 0:
+        return {"color": "green", "parity": "none", "range": "none", "dozen": "none", "column": "none"}
+    return {
+        "color": "red" if n in RED_NUMBERS else "black",
+        "parity": "even" if n % 2 == 0 else "odd",
+        "range": "low" if n <= 18 else "high",
+        "dozen": ("1st", "2nd", "3rd")[(n - 1) // 12],
+        "column": str((n - 1) % 3 + 1),
+    }
+
+
+# Eigenschaften jeder Zahl, einmal berechnet (Index = Zahl)
+OUTCOMES = tuple(_outcome(n) for n in NUMBERS)
+
+
+def _mask(numbers):
+    mask = 0
+    for n in numbers:
+        mask |= 1 << n
+    return mask
+
+
+def _key(numbers):
+    return "-".join(str(n) for n in sorted(numbers))
+
+
+def _inside_bets():
+    # Tableau: Reihen 1-2-3, 4-5-6, ... 34-35-36; Spalte = (n - 1) % 3
+    splits = [(0, 1), (0, 2), (0, 3)]
+    streets = [(0, 1, 2), (0, 2, 3)]  # Trios mit der Null zählen wie eine Street
+    corners = [(0, 1, 2, 3)]  # First Four
+    six_lines = []
+    for n in range(1, 37):
+        if n % 3 != 0:
+            splits.append((n, n + 1))
+        if n <= 33:
+            splits.append((n, n + 3))
+        if n % 3 == 1:
+            streets.append((n, n + 1, n + 2))
+            if n <= 31:
+                six_lines.append(tuple(range(n, n + 6)))
+        if n % 3 != 0 and n <= 32:
+            corners.append((n, n + 1, n + 3, n + 4))
+    return {"split": (splits, 17), "street": (streets, 11), "corner": (corners, 8), "six_line": (six_lines, 5)}
+
+
+def _build_bets():
+    bets = {("number", str(n)): (_mask([n]), 35) for n in NUMBERS}
+    for bet_type, (layouts, multiplier) in _inside_bets().items():
+        for numbers in layouts:
+            bets[(bet_type, _key(numbers))] = (_mask(numbers), multiplier)
+    outside = {"color": 1, "parity": 1, "range": 1, "dozen": 2, "column": 2}
+    for bet_type, multiplier in outside.items():
+        for value in {OUTCOMES[n][bet_type] for n in NUMBERS} - {"none", "green"}:
+            bets[(bet_type, value)] = (_mask(n for n in NUMBERS if OUTCOMES[n][bet_type] == value), multiplier)
+    return bets
+
+
+# (Typ, Wert) -> (Maske, Auszahlung x zu 1). Inside-Wetten als sortierte Zahlen, z.B. ("split", "17-20")
+BETS = _build_bets()
+INSIDE_TYPES = ("split", "street", "corner", "six_line")
+
+
+def bet_key(bet_type, value):
+    """(Typ, Wert) in der Schreibweise von BETS, oder None für ungültige Wetten.
+
+    Inside-Wetten dürfen die Zahlen in beliebiger Reihenfolge und mit '-' oder ',' trennen.
+    """
+    bet_type = str(bet_type).strip().lower()
+    value = str(value).strip().lower()
+    if bet_type in INSIDE_TYPES:
+        try:
+            value = _key(int(v) for v in value.replace(",", "-").split("-"))
+        except ValueError:
+            return None
+    elif bet_type == "number" and value.isdigit():
+        value = str(int(value))
+    key = (bet_type, value)
+    return key if key in BETS else None
+
+
+def spin():
+    return random.randint(0, 36)
+
+
+def settle(bets, number):
+    """bets: Liste von (mask, multiplier, amount). Gibt die Auszahlung inkl. Einsätze zurück."""
+    bit = 1 << number
+    return sum(amount * (multiplier + 1) for mask, multiplier, amount in bets if mask & bit)
@@ -0,0 +1,182 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from blackjack_engine import CARD_VALUES, DEALER_STANDS_ON, PAYOUTS, SHOE_DECKS
+
+try:
+    import numpy as np
+except ImportError:  # optional, nur für Simulationen (pip install numpy)
+    np = None
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
+
+# Einstellungen (.env)
+SIMULATOR_BATCH_SIZE = int(os.getenv("SIMULATOR_BATCH_SIZE", "100000"))
+
+# Reihenfolge der Ergebnisse in den Zählern (Index = Code im Array)
+OUTCOMES = ("player_win", "push", "dealer_win", "player_bust")
+_WIN, _PUSH, _DEALER_WIN, _BUST = range(len(OUTCOMES))
+
+# Mehr Karten braucht keine Hand (11 x Ass/2/3 ... ergibt sicher > 21 oder steht)
+_MAX_CARDS = 12
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("Für den Simulator wird numpy benötigt (pip install numpy)")
+
+
+# Strategien: f(total, soft, dealer_up) -> bool-Array "ziehen", alles Arrays pro Hand.
+# soft: Hand zählt noch ein Ass als 11; dealer_up: Wert der offenen Dealer-Karte (2-11).
+
+def stand_on(n):
+    """Ziehen bis mindestens n (wie der Dealer mit n=17)."""
+    def strategy(total, soft, dealer_up):
+        return total < n
+    strategy.__name__ = f"stand{n}"
+    return strategy
+
+
+@lru_cache(maxsize=None)
+def _basic_tables():
+    # Basic Strategy nur mit Hit/Stand (kein Double/Split im Spiel), Dealer steht auf soft 17.
+    # Index [total, dealer_up]; True = ziehen
+    hard = np.zeros((32, 12), dtype=bool)
+    soft = np.zeros((32, 12), dtype=bool)
+    hard[:12, :] = True
+    hard[12, [2, 3, 7, 8, 9, 10, 11]] = True
+    hard[13:17, 7:12] = True
+    soft[:18, :] = True
+    soft[18, 9:12] = True
+    return hard, soft
+
+
+def basic_strategy(total, soft, dealer_up):
+    hard_table, soft_table = _basic_tables()
+    return np.where(soft, soft_table[total, dealer_up], hard_table[total, dealer_up])
+
+
+STRATEGIES = {"basic": basic_strategy}
+
+
+def get_strategy(name):
+    """"basic" oder "standN" (z.B. "stand17")."""
+    if name in STRATEGIES:
+        return STRATEGIES[name]
+    if name.startswith("stand") and name[5:].isdigit():
+        return stand_on(int(name[5:]))
+    raise ValueError(f"Unbekannte Strategie: {name}")
+
+
+def _add(total, soft_aces, values, mask):
+    # Karte zu allen Händen in mask hinzufügen, Asse bei Bedarf von 11 auf 1 (wie Hand.add)
+    values = np.where(mask, values, 0)
+    total += values
+    soft_aces += values == 11
+    over = (total > 21) & (soft_aces > 0)
+    while over.any():
+        total -= 10 * over
+        soft_aces -= over
+        over = (total > 21) & (soft_aces > 0)
+
+
+def _play_batch(size, strategy, decks, rng):
+    """size Hände mit je frisch gemischtem Schuh; gibt die Ergebnis-Codes zurück."""
+    card_values = np.tile(np.asarray(CARD_VALUES, dtype=np.int8), decks)
+    # Pro Hand eine Permutation des Schuhs; Karten werden der Reihe nach gezogen
+    # (Spieler 0-1, Dealer 2-3, danach erst der Spieler, dann der Dealer)
+    shoe = rng.permuted(np.broadcast_to(card_values, (size, card_values.size)), axis=1)
+    rows = np.arange(size)
+
+    player = np.zeros(size, dtype=np.int16)
+    player_soft = np.zeros(size, dtype=np.int16)
+    dealer = np.zeros(size, dtype=np.int16)
+    dealer_soft = np.zeros(size, dtype=np.int16)
+    everyone = np.ones(size, dtype=bool)
+    for i in (0, 1):
+        _add(player, player_soft, shoe[:, i], everyone)
+    for i in (2, 3):
+        _add(dealer, dealer_soft, shoe[:, i], everyone)
+    dealer_up = shoe[:, 2]
+    pos = np.full(size, 4)
+
+    hitting = everyone
+    for _ in range(_MAX_CARDS):
+        hitting = hitting & (player <= 21) & strategy(player, player_soft > 0, dealer_up)
+        if not hitting.any():
+            break
+        _add(player, player_soft, shoe[rows, pos], hitting)
+        pos += hitting
+
+    busted = player > 21
+    drawing = ~busted
+    for _ in range(_MAX_CARDS):
+        drawing = drawing & (dealer < DEALER_STANDS_ON)
+        if not drawing.any():
+            break
+        _add(dealer, dealer_soft, shoe[rows, pos], drawing)
+        pos += drawing
+
+    outcome = np.full(size, _PUSH, dtype=np.int8)
+    outcome[(dealer > 21) | (player > dealer)] = _WIN
+    outcome[(dealer <= 21) & (player < dealer)] = _DEALER_WIN
+    outcome[busted] = _BUST
+    return outcome
+
+
+def _run(hands, strategy_name, decks, batch_size, seed):
+    # Ein Worker: Ergebnisse zählen (Summen reichen für RTP und Varianz)
+    strategy = get_strategy(strategy_name)
+    rng = np.random.default_rng(seed)
+    counts = np.zeros(len(OUTCOMES), dtype=np.int64)
+    done = 0
+    while done < hands:
+        size = min(batch_size, hands - done)
+        counts += np.bincount(_play_batch(size, strategy, decks, rng), minlength=len(OUTCOMES))
+        done += size
+    return counts
+
+
+def simulate(hands=1_000_000, strategy="basic", decks=None, batch_size=None, workers=1, seed=None):
+    """hands Hände nach den Regeln aus blackjack_engine spielen und die Auszahlung auswerten.
+
+    Jede Hand kommt aus einem frisch gemischten Schuh mit decks Decks (Standard
+    BLACKJACK_DECKS); ohne Kartenzählen entspricht das dem Schuh mit Cut Card.
+
+    Gibt RTP (ausgezahlt / eingesetzt), House Edge, Varianz und Standardfehler des
+    Nettogewinns pro Einsatz sowie die Verteilung der Ergebnisse zurück.
+    """
+    _require_numpy()
+    decks = decks or SHOE_DECKS
+    get_strategy(strategy)  # ungültige Namen vor dem Start der Worker melden
+    batch_size = batch_size or SIMULATOR_BATCH_SIZE
+    workers = max(1, min(workers, hands))
+    shares = [hands // workers + (i < hands % workers) for i in range(workers)]
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+
+    if workers == 1:
+        counts = _run(hands, strategy, decks, batch_size, seeds[0])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            counts = sum(pool.map(_run, shares, [strategy] * workers, [decks] * workers,
+                                  [batch_size] * workers, seeds))
+
+    returns = np.array([PAYOUTS[o] for o in OUTCOMES], dtype=float)
+    p = counts / hands
+    rtp = float(p @ returns)
+    # Nettogewinn pro Einsatz: Auszahlung - 1
+    variance = float(p @ (returns - 1) ** 2 - (rtp - 1) ** 2)
+    result = {
+        "hands": hands,
+        "strategy": strategy,
+        "decks": decks,
+        "rtp": rtp,
+        "house_edge": 1 - rtp,
+        "variance": variance,
+        "std_error": (variance / hands) ** 0.5,
+        "outcomes": {o: float(share) for o, share in zip(OUTCOMES, p)},
+    }
+    logger.info("Simulation %s: RTP %.4f über %s Hände", strategy, rtp, hands)
+    return result
@@ -0,0 +1,215 @@
+import logging
+import math
+import os
+from datetime import datetime
+import activity
+from db import db_read, db_stream, db_transaction, db_write, db_write_many
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
+
+# Auflösung der gespeicherten Saldo-Historie: "hour" oder "day"
+HISTORY_BUCKET = os.getenv("BALANCE_HISTORY_BUCKET", "hour")
+
+
+class InsufficientFunds(Exception):
+    """Saldo reicht für die Belastung nicht aus."""
+
+
+class InvalidAmount(ValueError):
+    """Betrag ist nicht endlich oder (bei debit/credit) nicht > 0."""
+
+
+def is_valid_amount(amount):
+    """Einsatz/Gutschrift: endlich und > 0 (float() akzeptiert auch "nan", "inf", "-5")."""
+    return math.isfinite(amount) and amount > 0
+
+
+def _invalid(user_id, amount):
+    return InvalidAmount(f"user {user_id}: invalid amount {amount!r}")
+
+
+def create_wallet(user_id, initial=0.00):
+    """Legt die Wallet an (falls nicht vorhanden); der Startsaldo ist zugleich der Höchststand."""
+    db_write(
+        "INSERT IGNORE INTO wallets (user_id, balance, best_balance) VALUES (%s, %s, %s)",
+        (user_id, initial, initial),
+    )
+
+
+def lock(tx, user_id):
+    """Wallet im laufenden db_transaction() tx sperren (SELECT ... FOR UPDATE), bei Bedarf anlegen.
+
+    Jede Abrechnung ruft das als Erstes auf: alle Transaktionen eines Users sperren so
+    zuerst die Wallet und erst danach Spiel-, Statistik- und XP-Zeilen. In anderer
+    Reihenfolge können sich zwei Runden gegenseitig blockieren (MySQL errno 1213).
+    """
+    if not tx.read("SELECT id FROM wallets WHERE user_id=%s FOR UPDATE", (user_id,), single=True):
+        create_wallet(user_id)
+
+
+def get_balance(user_id, primary=False):
+    """Aktueller Saldo; legt eine leere Wallet an, falls noch keine existiert."""
+    wallet = db_read("SELECT balance FROM wallets WHERE user_id=%s", (user_id,), single=True, primary=primary)
+    if not wallet:
+        create_wallet(user_id)
+        return 0.00
+    return float(wallet["balance"])
+
+
+def get_balance_and_best(user_id):
+    """(Saldo, persönlicher Höchststand) mit einem Primary-Key-Lookup."""
+    wallet = db_read(
+        "SELECT balance, best_balance FROM wallets WHERE user_id=%s", (user_id,), single=True
+    )
+    if not wallet:
+        create_wallet(user_id)
+        return 0.00, 0.00
+    return float(wallet["balance"]), float(wallet["best_balance"])
+
+
+def _bucket(now):
+    if HISTORY_BUCKET == "day":
+        return now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return now.replace(minute=0, second=0, microsecond=0)
+
+
+def _record_history(user_id, balance, now=None):
+    # Ein Punkt pro Bucket: Schlusssaldo plus Hoch/Tief innerhalb des Buckets
+    db_write(
+        "INSERT INTO balance_history (user_id, bucket, balance, high, low) VALUES (%s, %s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE balance=VALUES(balance), "
+        "high=GREATEST(high, VALUES(high)), low=LEAST(low, VALUES(low))",
+        (user_id, _bucket(now or datetime.utcnow()), balance, balance, balance),
+    )
+
+
+def _update_balance(tx, user_id, delta, required):
+    # best_balance zuerst: MySQL wertet SET-Zuweisungen von links nach rechts aus,
+    # so sehen beide Backends hier noch den alten Saldo
+    return tx.write(
+        "UPDATE wallets SET best_balance = GREATEST(best_balance, balance + %s), balance = balance + %s "
+        "WHERE user_id=%s AND balance >= %s",
+        (delta, delta, user_id, required),
+    ).rowcount
+
+
+def apply_entries(user_id, entries):
+    """Bucht mehrere Beträge atomar auf die Wallet.
+
+    entries: Liste von (amount, type, description); negative Beträge belasten.
+    Der Saldo wird mit EINEM bedingten UPDATE (balance = balance + delta) geändert,
+    das nur greift, wenn die Summe aller Belastungen gedeckt ist. Im selben
+    Statement wird der Höchststand (best_balance) nachgeführt. Dazu kommen die
+    Ledger-Zeilen in transactions und der Punkt in balance_history, alles in
+    einer Transaktion.
+    Gibt den neuen Saldo zurück, wirft InsufficientFunds, wenn er nicht reicht,
+    und InvalidAmount, wenn ein Betrag nicht endlich ist (nan/inf aus float() der Formulardaten).
+    """
+    for amount, _type, _description in entries:
+        if not math.isfinite(amount):
+            raise _invalid(user_id, amount)
+    entries = [e for e in entries if e[0]]
+    delta = sum(e[0] for e in entries)
+    required = -sum(e[0] for e in entries if e[0] < 0)
+
+    with db_transaction() as tx:
+        if entries:
+            if not _update_balance(tx, user_id, delta, required):
+                if tx.read("SELECT id FROM wallets WHERE user_id=%s", (user_id,), single=True):
+                    raise InsufficientFunds(f"user {user_id}: {required:.2f} required")
+                # Noch keine Wallet: mit 0.00 anlegen und erneut versuchen
+                create_wallet(user_id)
+                if not _update_balance(tx, user_id, delta, required):
+                    raise InsufficientFunds(f"user {user_id}: {required:.2f} required")
+
+            db_write_many(
+                "INSERT INTO transactions (user_id, amount, type, description) VALUES (%s, %s, %s, %s)",
+                [(user_id, amount, type_, description) for amount, type_, description in entries],
+            )
+
+        row = tx.read("SELECT balance FROM wallets WHERE user_id=%s", (user_id,), single=True)
+        balance = float(row["balance"]) if row else 0.00
+        if entries:
+            _record_history(user_id, balance)
+            activity.bump(user_id)
+    return balance
+
+
+def debit(user_id, amount, reason, description=None):
+    """Belastet die Wallet (amount > 0) und gibt den neuen Saldo zurück."""
+    # Ein negativer Einsatz wäre sonst eine Gutschrift (balance >= -x greift immer)
+    if not is_valid_amount(amount):
+        raise _invalid(user_id, amount)
+    return apply_entries(user_id, [(-amount, reason, description)])
+
+
+def credit(user_id, amount, reason, description=None):
+    """Schreibt amount gut (amount > 0) und gibt den neuen Saldo zurück."""
+    if not is_valid_amount(amount):
+        raise _invalid(user_id, amount)
+    return apply_entries(user_id, [(amount, reason, description)])
+
+
+def balance_series(user_id, start, end, resolution="day"):
+    """Saldo-Verlauf fürs Chart: ein Punkt pro Stunde oder Tag im Bereich [start, end].
+
+    Liest nur balance_history (Range-Read über user_id/bucket), kein Ledger-Replay.
+    """
+    rows = db_read(
+        "SELECT bucket, balance, high, low FROM balance_history "
+        "WHERE user_id=%s AND bucket BETWEEN %s AND %s ORDER BY bucket ASC",
+        (user_id, start, end),
+    )
+    points = []
+    for r in rows:
+        bucket = r["bucket"]
+        if resolution == "day":
+            bucket = bucket.replace(hour=0)
+        if points and points[-1]["bucket"] == bucket:
+            p = points[-1]
+            p["balance"] = float(r["balance"])
+            p["high"] = max(p["high"], float(r["high"]))
+            p["low"] = min(p["low"], float(r["low"]))
+        else:
+            points.append({
+                "bucket": bucket,
+                "balance": float(r["balance"]),
+                "high": float(r["high"]),
+                "low": float(r["low"]),
+            })
+    return points
+
+
+def backfill(user_id):
+    """Einmalig für Bestandsdaten: best_balance und balance_history aus dem Ledger rekonstruieren."""
+    with db_transaction() as tx:
+        row = tx.read("SELECT balance FROM wallets WHERE user_id=%s", (user_id,), single=True)
+        if not row:
+            return
+        total = tx.read(
+            "SELECT COALESCE(SUM(amount), 0) AS total FROM transactions WHERE user_id=%s",
+            (user_id,),
+            single=True,
+        )
+        running = float(row["balance"]) - float(total["total"])
+        best = running
+        points = {}
+        for amount, created_at in db_stream(
+            "SELECT amount, created_at FROM transactions WHERE user_id=%s ORDER BY created_at ASC, id ASC",
+            (user_id,),
+            as_dict=False,
+        ):
+            running += float(amount)
+            best = max(best, running)
+            if created_at:
+                bucket = _bucket(created_at)
+                high, low = points.get(bucket, (running, running, running))[1:]
+                points[bucket] = (running, max(high, running), min(low, running))
+
+        tx.write("UPDATE wallets SET best_balance=%s WHERE user_id=%s", (round(best, 2), user_id))
+        tx.write("DELETE FROM balance_history WHERE user_id=%s", (user_id,))
+        db_write_many(
+            "INSERT INTO balance_history (user_id, bucket, balance, high, low) VALUES (%s, %s, %s, %s, %s)",
+            [(user_id, bucket, b, h, l) for bucket, (b, h, l) in sorted(points.items())],
+        )
@@ -0,0 +1,108 @@
+import logging
+import activity
+from db import db_read, db_transaction, db_write
+
+# Logger für dieses Modul
+logger = logging.getLogger(__name__)
+
+# XP pro gespielter Runde, zusätzlich pro Sieg, und pro Level
+XP_PER_GAME = 10
+XP_PER_WIN = 50
+XP_PER_LEVEL = 500
+
+
+def level_for(xp_total):
+    return max(1, int(xp_total) // XP_PER_LEVEL + 1)
+
+
+def game_xp(games, wins):
+    """XP aus Runden und Siegen (game_stats verbucht sie bei jeder Abrechnung in xp_total)."""
+    return games * XP_PER_GAME + wins * XP_PER_WIN
+
+
+def _add_total(user_id, amount):
+    db_write(
+        "INSERT INTO user_game_stats (user_id, xp_total) VALUES (%s, %s) "
+        "ON DUPLICATE KEY UPDATE xp_total = xp_total + VALUES(xp_total)",
+        (user_id, amount),
+    )
+
+
+def award(user_id, awards):
+    """awards: Liste von (award_key, amount). Jeder Key wird pro User nur einmal
+    vergeben (UNIQUE user_id/award_key); xp_total steigt in derselben Transaktion
+    um die tatsächlich neuen Beträge. Gibt die Anzahl neu vergebener Belohnungen zurück.
+
+    Ein INSERT IGNORE pro Belohnung: nur so sagt der rowcount genau, welche neu
+    war (Belohnungen fallen pro Runde höchstens eine Handvoll an).
+    """
+    awards = [(key, amount) for key, amount in awards if amount > 0]
+    if not awards:
+        return 0
+    inserted = 0
+    total = 0
+    with db_transaction() as tx:
+        for key, amount in awards:
+            if tx.write(
+                "INSERT IGNORE INTO xp_rewards (user_id, amount, source, award_key) VALUES (%s, %s, %s, %s)",
+                (user_id, amount, key, key),
+            ).rowcount:
+                inserted += 1
+                total += amount
+        if total:
+            _add_total(user_id, total)
+            activity.bump(user_id)
+    return inserted
+
+
+def grant(user_id, amount, source):
+    """Wiederholbare XP (z.B. Lucky Wheel): Ledger-Zeile ohne award_key plus xp_total."""
+    if amount <= 0:
+        return
+    with db_transaction() as tx:
+        tx.write(
+            "INSERT INTO xp_rewards (user_id, amount, source) VALUES (%s, %s, %s)",
+            (user_id, amount, source),
+        )
+        _add_total(user_id, amount)
+        activity.bump(user_id)
+
+
+def get_progress(user_id):
+    """XP und Level des Users mit einem Primary-Key-Lookup.
+
+    {"xp": gesamt, "level": ..., "level_xp": XP im aktuellen Level, "level_size": XP pro Level}
+    """
+    row = db_read("SELECT xp_total FROM user_game_stats WHERE user_id=%s", (user_id,), single=True)
+    xp_total = int((row or {}).get("xp_total") or 0)
+    return {
+        "xp": xp_total,
+        "level": level_for(xp_total),
+        "level_xp": xp_total % XP_PER_LEVEL,
+        "level_size": XP_PER_LEVEL,
+    }
+
+
+def backfill():
+    """Einmalig: xp_total aller User aus Spielzählern und xp_rewards neu berechnen.
+    Vorher game_stats.backfill() laufen lassen."""
+    with db_transaction() as tx:
+        bonus = {
+            r["user_id"]: int(r["total"] or 0)
+            for r in tx.read("SELECT user_id, SUM(amount) AS total FROM xp_rewards GROUP BY user_id")
+        }
+        rows = tx.read(
+            "SELECT user_id, bj_total + ru_total AS games, bj_wins + ru_wins AS wins FROM user_game_stats"
+        )
+        for r in rows:
+            total = game_xp(int(r["games"]), int(r["wins"])) + bonus.pop(r["user_id"], 0)
+            tx.write("UPDATE user_game_stats SET xp_total=%s WHERE user_id=%s", (total, r["user_id"]))
+        # User mit XP, aber ohne Spiele (z.B. nur Lucky Wheel)
+        for user_id, total in bonus.items():
+            tx.write(
+                "INSERT INTO user_game_stats (user_id, xp_total) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE xp_total = VALUES(xp_total)",
+                (user_id, total),
+            )
+    logger.info("xp_total für %s User neu berechnet", len(rows) + len(bonus))
+    return len(rows) + len(bonus)